@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Benchmark - latency, throughput and memory of the search pipeline
+Usage: python bench.py [--scales 1,10,100] [--repeat 5] [--ops search,search_stack,design_system]
+       python bench.py --json --output bench.json
+       python bench.py --baseline bench.json [--tolerance 0.25]
+       python bench.py --import-time [--import-budget 50]
+
+Each scale runs against a synthetic copy of the data directory in which every
+CSV has its rows repeated `scale` times (scale 1 uses the vendored data as is).
+
+Modes:
+  cold   Index, result, query-token and generation caches are cleared and
+         the precompiled index file is ignored before every call
+  warm   Indexes are primed once; result and generation caches are cleared
+         before every call, so each call still scores and generates
+  cached Everything is primed once, then every call is a result-cache hit
+
+Reports p50/p95 latency (ms), throughput (calls/s) and peak traced memory (MB)
+per scale, operation and mode. With --baseline, exits non-zero when any p50
+is slower than the baseline by more than --tolerance.
+
+Start-up check:
+  --import-time  Time `import search` with -X importtime in fresh interpreters
+                 and exit non-zero if the best run exceeds --import-budget ms
+                 or a module that should load lazily (LAZY_MODULES) is imported
+"""
+
+import argparse
+import csv
+import json
+import shutil
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import core
+import design_system
+
+# Fixed query corpus: a few realistic queries per domain and stack
+QUERIES = {
+    "style": ["glassmorphism dark mode", "minimal clean saas", "brutalist bold"],
+    "prompt": ["neumorphism soft shadow", "retro vaporwave", "flat design css"],
+    "color": ["healthcare calm palette", "fintech trust blue", "luxury gold"],
+    "chart": ["trend over time", "part to whole comparison", "real-time stream"],
+    "landing": ["hero cta conversion", "pricing social proof", "waitlist launch"],
+    "product": ["saas dashboard", "e-commerce marketplace", "beauty spa wellness"],
+    "ux": ["focus states keyboard", "loading skeleton", "form validation errors"],
+    "typography": ["elegant serif", "modern geometric sans", "playful rounded"],
+}
+STACK_QUERIES = ["form validation", "rerender memo performance", "responsive layout"]
+DESIGN_SYSTEM_QUERIES = ["saas dashboard", "fintech crypto app", "e-commerce luxury"]
+
+OPERATIONS = ("search", "search_stack", "design_system")
+MODES = ("cold", "warm", "cached")
+
+IMPORT_BUDGET_MS = 50  # Cumulative `import search` time, best of IMPORT_RUNS
+IMPORT_RUNS = 5
+# Only needed by design systems, the daemon or large parallel index builds
+LAZY_MODULES = (
+    "design_system",
+    "concurrent.futures.process",
+    "socketserver",
+    "pickle",
+)
+
+
+# ============ SYNTHETIC DATA ============
+def build_scaled_data(scale: int, target: Path) -> Path:
+    """Copy DATA_DIR to target with every CSV's rows repeated `scale` times."""
+    for source in core.DATA_DIR.rglob("*"):
+        dest = target / source.relative_to(core.DATA_DIR)
+        if source.is_dir():
+            dest.mkdir(parents=True, exist_ok=True)
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if source.suffix != ".csv":
+            shutil.copyfile(source, dest)
+            continue
+        with open(source, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        with open(dest, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(rows[0] if rows else [])
+            for _ in range(scale):
+                writer.writerows(rows[1:])
+    return target
+
+
+def use_data_dir(data_dir: Path):
+    """Point core and design_system at data_dir and drop everything cached."""
+    core.DATA_DIR = data_dir
+    design_system.DATA_DIR = data_dir
+    reset_caches()
+
+
+def reset_caches():
+    """Clear every cache a cold call would not have."""
+    core.clear_index_cache()
+    core.tokenize_query.cache_clear()
+    design_system.reload_generator()
+    reset_result_caches()
+
+
+def reset_result_caches():
+    """Clear the caches of finished results, keeping indexes and the generator."""
+    core.clear_result_cache()
+    design_system.configure_generation_cache()
+
+
+# ============ WORKLOADS ============
+def workload(op: str) -> list:
+    """Return the (callable, args) calls making up one pass of an operation."""
+    if op == "search":
+        return [
+            (core.search, (query, domain, core.MAX_RESULTS))
+            for domain, queries in QUERIES.items()
+            for query in queries
+        ]
+    if op == "search_stack":
+        return [
+            (core.search_stack, (query, stack, core.MAX_RESULTS))
+            for stack in core.AVAILABLE_STACKS
+            for query in STACK_QUERIES
+        ]
+    if op == "design_system":
+        return [
+            (design_system.generate_design_system, (query,))
+            for query in DESIGN_SYSTEM_QUERIES
+        ]
+    raise ValueError(f"Unknown op: {op}. Available: {', '.join(OPERATIONS)}")
+
+
+def _percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def measure(op: str, mode: str, repeat: int) -> dict:
+    """Time `repeat` passes of an operation's workload, then trace peak memory."""
+    calls = workload(op)
+    reset = {"cold": reset_caches, "warm": reset_result_caches}.get(mode)
+    if mode != "cold":
+        for func, args in calls:
+            func(*args)
+
+    latencies = []
+    for _ in range(repeat):
+        for func, args in calls:
+            if reset:
+                reset()
+            start = time.perf_counter()
+            func(*args)
+            latencies.append(time.perf_counter() - start)
+
+    # Separate pass: tracemalloc distorts timings, so it never overlaps them
+    tracemalloc.start()
+    try:
+        for func, args in calls:
+            if reset:
+                reset()
+            func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput": round(len(latencies) / total, 1) if total else None,
+        "peak_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def run_benchmarks(scales: list, ops: list, modes: list, repeat: int) -> list:
+    """Run every (scale, op, mode) combination and return one record per run."""
+    original_dir, original_index = core.DATA_DIR, core.INDEX_FILE
+    core.INDEX_FILE = None  # Precompiled indexes only describe the vendored data
+    records = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="uipro-bench-") as tmp:
+            for scale in scales:
+                data_dir = (
+                    original_dir
+                    if scale == 1
+                    else build_scaled_data(scale, Path(tmp) / f"x{scale}")
+                )
+                use_data_dir(data_dir)
+                for op in ops:
+                    for mode in modes:
+                        result = measure(op, mode, repeat)
+                        records.append(
+                            {"scale": scale, "op": op, "mode": mode, **result}
+                        )
+    finally:
+        core.INDEX_FILE = original_index
+        use_data_dir(original_dir)
+    return records
+
+
+# ============ START-UP ============
+def measure_import_time(module: str = "search", runs: int = IMPORT_RUNS) -> dict:
+    """Best cumulative -X importtime of `module` and any LAZY_MODULES it loaded."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Time cached bytecode, as users get
+    best = None
+    imported = set()
+    for _ in range(runs + 1):  # First run only writes bytecode caches
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=Path(__file__).parent,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            imported.add(name.strip())
+            if name.strip() == module and cumulative.strip().isdigit():
+                elapsed = int(cumulative) / 1000
+                if best is None or elapsed < best:
+                    best = elapsed
+    return {
+        "module": module,
+        "best_ms": best,
+        "eager": [name for name in LAZY_MODULES if name in imported],
+    }
+
+
+# ============ REPORTING ============
+def format_table(records: list) -> str:
+    """Render benchmark records as a fixed-width table."""
+    header = (
+        f"{'scale':>5}  {'op':<14} {'mode':<6} {'calls':>5} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'calls/s':>9} {'peak MB':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in records:
+        lines.append(
+            f"{r['scale']:>5}  {r['op']:<14} {r['mode']:<6} {r['calls']:>5} "
+            f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['throughput'] or 0:>9.1f} "
+            f"{r['peak_mb']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(records: list, baseline: list, tolerance: float) -> list:
+    """Return a message for every run whose p50 regressed beyond tolerance."""
+    previous = {(r["scale"], r["op"], r["mode"]): r for r in baseline}
+    regressions = []
+    for r in records:
+        before = previous.get((r["scale"], r["op"], r["mode"]))
+        if before and r["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{r['op']} {r['mode']} x{r['scale']}: "
+                f"p50 {before['p50_ms']:.3f}ms -> {r['p50_ms']:.3f}ms"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UI Pro Max Benchmark")
+    parser.add_argument(
+        "--scales", default="1,10,100", help="Comma-separated row multipliers"
+    )
+    parser.add_argument(
+        "--ops",
+        default=",".join(OPERATIONS),
+        help=f"Comma-separated operations ({', '.join(OPERATIONS)})",
+    )
+    parser.add_argument(
+        "--modes",
+        default=",".join(MODES),
+        help="Comma-separated modes (cold, warm, cached)",
+    )
+    parser.add_argument(
+        "--repeat", "-r", type=int, default=5, help="Passes over each workload"
+    )
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--output", "-o", help="Also write JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results to compare p50 latency with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed p50 slowdown vs --baseline (default: 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--import-time",
+        action="store_true",
+        help="Only check search.py start-up against --import-budget",
+    )
+    parser.add_argument(
+        "--import-budget",
+        type=float,
+        default=IMPORT_BUDGET_MS,
+        help=f"Max ms for `import search` (default: {IMPORT_BUDGET_MS})",
+    )
+    args = parser.parse_args()
+
+    if args.import_time:
+        result = measure_import_time()
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(
+                f"import {result['module']}: {result['best_ms']:.1f}ms "
+                f"(budget {args.import_budget:g}ms)"
+            )
+        failures = []
+        if result["best_ms"] > args.import_budget:
+            failures.append(f"start-up {result['best_ms']:.1f}ms over budget")
+        failures += [f"{name} imported eagerly" for name in result["eager"]]
+        for line in failures:
+            print(f"  {line}", file=sys.stderr)
+        raise SystemExit(1 if failures else 0)
+
+    ops = [op.strip() for op in args.ops.split(",") if op.strip()]
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for name in ops:
+        if name not in OPERATIONS:
+            parser.error(f"unknown op: {name}")
+    for name in modes:
+        if name not in MODES:
+            parser.error(f"unknown mode: {name}")
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    records = run_benchmarks(scales, ops, modes, args.repeat)
+    if args.output:
+        Path(args.output).write_text(json.dumps(records, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(records, indent=2))
+    else:
+        print(format_table(records))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(records, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            raise SystemExit(1)
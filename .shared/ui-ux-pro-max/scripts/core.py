@@ -5,14 +5,45 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
 import csv
+import heapq
+import io
+import os
 import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from functools import lru_cache, wraps
+from itertools import accumulate, chain
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from operator import sub
+from collections import OrderedDict
+
+# pickle and copy are imported where they are used: a one-shot search with no
+# precompiled index file never needs them.
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
+INDEX_CACHE_SIZE = 32  # Max fitted CSV indexes kept in memory (LRU)
+RESULT_CACHE_SIZE = 1024  # Max search results kept in memory (LRU); 0 disables
+INDEX_FILE = Path(__file__).parent.parent / ".cache" / "search-index.bin"
+# "python", "numpy" or "auto" (NumPy when installed and the corpus is large)
+BM25_BACKEND = os.environ.get("UIPRO_BM25_BACKEND", "auto")
+NUMPY_MIN_DOCS = 5000
+# Cold index builds fan out to worker processes only when there is enough data
+PROCESS_POOL_MIN_BYTES = 8 * 1024 * 1024
+# Set to "1"/"table" or "json" to record per-stage timings (see PROFILING)
+PROFILE_ENV = "UIPRO_PROFILE"
+# Read size used when checksumming the indexed data to confirm an append
+APPEND_CHUNK_BYTES = 1024 * 1024
+# "memory" keeps result columns in RAM; "mmap" decodes returned rows on demand
+ROW_STORAGE = os.environ.get("UIPRO_ROW_STORAGE", "memory")
+ROW_STORAGE_MODES = ("memory", "mmap")
 
 CSV_CONFIG = {
     "style": {
@@ -232,222 +263,1656 @@ _STACK_COLS = {
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 
+# ============ PROFILING ============
+class Profiler:
+    """
+    Thread-safe per-stage timing recorder.
+
+    Stages are wrapped with @profiled; while disabled a wrapped call costs one
+    attribute check. Times are inclusive, so nested stages overlap.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def stats(self):
+        """Return {stage: {calls, total_ms, mean_ms, max_ms}}, slowest first"""
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: -item[1][1])
+        return {
+            stage: {
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / calls, 3),
+                "max_ms": round(longest * 1000, 3),
+            }
+            for stage, (calls, total, longest) in stages
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+_profiler = Profiler(enabled=bool(os.environ.get(PROFILE_ENV)))
+
+
+def profiled(stage):
+    """Decorator recording the wall time of each call under `stage`"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _profiler.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _profiler.record(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def enable_profiling(enabled=True):
+    """Start (or stop) recording stage timings"""
+    _profiler.enabled = enabled
+
+
+def profile_stats():
+    """Return recorded stage timings (see Profiler.stats)"""
+    return _profiler.stats()
+
+
+def reset_profile():
+    """Drop all recorded stage timings"""
+    _profiler.reset()
+
+
+def format_profile(output_format="table"):
+    """Render recorded stage timings as a table or JSON"""
+    stats = profile_stats()
+    if output_format == "json":
+        import json
+
+        return json.dumps(stats, indent=2)
+    width = max([len("stage")] + [len(stage) for stage in stats])
+    header = (
+        f"{'stage':<{width}} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for stage, entry in stats.items():
+        lines.append(
+            f"{stage:<{width}} {entry['calls']:>7} {entry['total_ms']:>10.3f} "
+            f"{entry['mean_ms']:>9.3f} {entry['max_ms']:>9.3f}"
+        )
+    return "\n".join(lines)
+
+
 # ============ BM25 IMPLEMENTATION ============
+# Tokens are runs of 3+ word characters, i.e. what remains after replacing
+# punctuation with spaces, splitting, and dropping words of 1-2 characters
+_TOKEN_RE = re.compile(r"\w{3,}")
+QUERY_TOKEN_CACHE_SIZE = 4096
+
+
+def tokenize(text):
+    """Lowercase, split, remove punctuation, filter short words"""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _tokenize_all(documents):
+    """Lazily tokenize documents, timing it as bm25.tokenize when profiling"""
+    if not _profiler.enabled:
+        return map(tokenize, documents)
+
+    def timed():
+        elapsed = 0.0
+        for doc in documents:
+            start = time.perf_counter()
+            tokens = tokenize(doc)
+            elapsed += time.perf_counter() - start
+            yield tokens
+        _profiler.record("bm25.tokenize", elapsed)
+
+    return timed()
+
+
+@lru_cache(maxsize=QUERY_TOKEN_CACHE_SIZE)
+def tokenize_query(query):
+    """Cached tokenize() for query strings, which recur far more than documents"""
+    return tuple(tokenize(query))
+
+
+_np = None
+
+
+def _numpy():
+    """Import NumPy on first use; return None when it is not installed"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _np = numpy
+    return _np or None
+
+
+class _CsrMatrix:
+    """Term-document matrix in CSR layout (one row per term ID) for NumPy scoring"""
+
+    def __init__(self, bm25, np):
+        # BM25 already stores postings as flat CSR arrays; view them zero-copy
+        # in their native dtypes (arithmetic with floats promotes as needed).
+        # Safe because BM25 replaces these arrays instead of resizing them.
+        self.indptr = np.frombuffer(bm25.offsets, dtype=np.uint32)
+        self.indices = np.frombuffer(bm25.doc_ids, dtype=np.uint32)
+        self.tfs = np.frombuffer(bm25.tfs, dtype=np.uint32)
+        self.idf = np.frombuffer(bm25.idf, dtype=np.float64)
+        # Length normalization k1 * (1 - b + b * dl / avgdl), one entry per doc
+        doc_lengths = np.frombuffer(bm25.doc_lengths, dtype=np.uint32)
+        self.norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_lengths / (bm25.avgdl or 1))
+        self.k1 = bm25.k1
+        # Impact mode: fold idf and normalization into one weight per entry
+        self.weights = None
+        if bm25.impact:
+            idf = np.repeat(self.idf, np.diff(self.indptr))
+            self.weights = (
+                idf * (self.tfs * (self.k1 + 1)) / (self.tfs + self.norm[self.indices])
+            )
+
+    def gather(self, term_ids, np):
+        """Return (doc ids, score contributions) for all postings of term_ids"""
+        spans = [
+            (self.indptr[tid], self.indptr[tid + 1], self.idf[tid]) for tid in term_ids
+        ]
+        if not spans:
+            return np.zeros(0, dtype=np.uint32), np.zeros(0)
+        docs = np.concatenate([self.indices[s:e] for s, e, _ in spans])
+        if self.weights is not None:
+            return docs, np.concatenate([self.weights[s:e] for s, e, _ in spans])
+        tfs = np.concatenate([self.tfs[s:e] for s, e, _ in spans])
+        idf = np.concatenate([np.full(e - s, w) for s, e, w in spans])
+        return docs, idf * (tfs * (self.k1 + 1)) / (tfs + self.norm[docs])
+
+
+# Guards the one-time allocation of a BM25 index's impact arrays
+_impact_lock = threading.Lock()
+
+
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """
+    BM25 ranking algorithm for text search
+
+    Terms are interned into integer IDs (vocab). Postings are stored as one
+    contiguous CSR-style buffer: the postings of term t are
+    doc_ids[offsets[t]:offsets[t + 1]] (ascending) with matching tfs, so
+    memory grows with unique (term, doc) pairs, not with total tokens.
 
-    def __init__(self, k1=1.5, b=0.75):
-        self.k1 = k1
-        self.b = b
-        self.corpus = []
-        self.doc_lengths = []
+    With impact=True, the full per-(term, doc) weight
+    idf * tf*(k1+1) / (tf + k1*norm_d) is cached in impact_docs/impact_weights
+    (same offsets, highest weight first), so scoring a query is a sum of
+    lookups. A term's weights are computed the first time it is queried
+    (impact_ready marks which); compute_impacts() fills in all of them, e.g.
+    before an index is saved or served. Changing k1 or b re-derives the
+    weights on the next query.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, backend=None, impact=False):
+        self._k1 = k1
+        self._b = b
+        self.backend = backend or BM25_BACKEND
+        self.impact = impact
+        self.vocab = {}
+        self.offsets = array("I", [0])
+        self.doc_ids = array("I")
+        self.tfs = array("I")
+        self.doc_lengths = array("I")
         self.avgdl = 0
-        self.idf = {}
-        self.doc_freqs = defaultdict(int)
+        self.idf = array("d")
+        self.doc_freqs = array("I")
+        self.impact_docs = None
+        self.impact_weights = None
+        self.impact_ready = None
         self.N = 0
+        self._csr = None
+
+    def __getstate__(self):
+        # The NumPy matrix is rebuilt on demand
+        state = self.__dict__.copy()
+        state["_csr"] = None
+        return state
+
+    @property
+    def k1(self):
+        return self._k1
+
+    @k1.setter
+    def k1(self, value):
+        self._k1 = value
+        self._invalidate_weights()
+
+    @property
+    def b(self):
+        return self._b
+
+    @b.setter
+    def b(self, value):
+        self._b = value
+        self._invalidate_weights()
+
+    def _invalidate_weights(self):
+        """Drop everything derived from k1/b; rebuilt lazily on the next query"""
+        self.impact_ready = None
+        self.impact_docs = None
+        self.impact_weights = None
+        self._csr = None
+
+    def _numpy_backend(self):
+        """Return NumPy if this index should be scored with it, else None"""
+        if self.backend == "python" or self.N == 0:
+            return None
+        if self.backend == "auto" and self.N < NUMPY_MIN_DOCS:
+            return None
+        np = _numpy()
+        if np is not None and self._csr is None:
+            self._csr = _CsrMatrix(self, np)
+        return np
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r"[^\w\s]", " ", str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
+        return tokenize(text)
+
+    def term_ids(self, query):
+        """Map a query to the IDs of its known terms (unknown terms are dropped)"""
+        vocab = self.vocab
+        return [vocab[t] for t in tokenize_query(query) if t in vocab]
+
+    def postings(self, term_id):
+        """Return the (doc_id, tf) pairs of a term in ascending doc order"""
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return list(zip(self.doc_ids[start:end], self.tfs[start:end]))
+
+    def _impact_table(self):
+        """Return (impact_docs, impact_weights, impact_ready), allocated on first use"""
+        if self.impact_ready is None:
+            with _impact_lock:
+                if self.impact_ready is None:
+                    self.impact_docs = array("I", self.doc_ids)
+                    self.impact_weights = array("d", bytes(8 * len(self.doc_ids)))
+                    # Set last: readers check it before touching the arrays
+                    self.impact_ready = bytearray(len(self.offsets) - 1)
+        return self.impact_docs, self.impact_weights, self.impact_ready
 
+    def _fill_impacts(self, tid, docs, weights, ready):
+        """Compute one term's impact-ordered postings into the impact arrays"""
+        k1, b, avgdl, idf = self.k1, self.b, self.avgdl, self.idf[tid]
+        doc_lengths = self.doc_lengths
+        start, end = self.offsets[tid], self.offsets[tid + 1]
+        weighted = [
+            (
+                idx,
+                idf
+                * (tf * (k1 + 1))
+                / (tf + k1 * (1 - b + b * doc_lengths[idx] / avgdl)),
+            )
+            for idx, tf in zip(self.doc_ids[start:end], self.tfs[start:end])
+        ]
+        weighted.sort(key=lambda p: p[1], reverse=True)
+        # Same-length slice assignments: concurrent readers of other terms are safe
+        docs[start:end] = array("I", [idx for idx, _ in weighted])
+        weights[start:end] = array("d", [weight for _, weight in weighted])
+        ready[tid] = 1
+
+    def term_impacts(self, tid):
+        """Return the impact-ordered (doc ids, weights) of one term"""
+        docs, weights, ready = self._impact_table()
+        if not ready[tid]:
+            self._fill_impacts(tid, docs, weights, ready)
+        start, end = self.offsets[tid], self.offsets[tid + 1]
+        return docs[start:end], weights[start:end]
+
+    def compute_impacts(self):
+        """Compute the impact-ordered postings of every term not yet queried"""
+        docs, weights, ready = self._impact_table()
+        for tid in range(len(ready)):
+            if not ready[tid]:
+                self._fill_impacts(tid, docs, weights, ready)
+
+    @profiled("bm25.fit")
     def fit(self, documents):
         """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+        vocab = {}
+        term_docs = []
+        term_tfs = []
+        doc_lengths = array("I")
+        for idx, tokens in enumerate(_tokenize_all(documents)):
+            # Count words first: dict order keeps first occurrence, so term IDs
+            # are still assigned in first-occurrence order
+            term_freqs = {}
+            for word in tokens:
+                term_freqs[word] = term_freqs.get(word, 0) + 1
+            for word, tf in term_freqs.items():
+                tid = vocab.get(word)
+                if tid is None:
+                    tid = vocab[sys.intern(word)] = len(term_docs)
+                    term_docs.append([])
+                    term_tfs.append([])
+                term_docs[tid].append(idx)
+                term_tfs[tid].append(tf)
+            doc_lengths.append(len(tokens))
+
+        # Flatten per-term postings into one contiguous buffer
+        offsets = array("I", accumulate(map(len, term_docs), initial=0))
+        doc_ids = array("I", chain.from_iterable(term_docs))
+        tfs = array("I", chain.from_iterable(term_tfs))
+
+        self._set_postings(vocab, offsets, doc_ids, tfs, doc_lengths)
+
+    @profiled("bm25.extend")
+    def extend(self, documents):
+        """
+        Add documents after the fitted ones, tokenizing only the new ones.
+
+        The result is identical to fit() over all documents: new terms get the
+        next IDs in first-occurrence order and new postings go after the old
+        ones. idf and impact weights are re-derived, since N and avgdl change.
+        Containers are replaced rather than mutated, so a shallow copy can be
+        extended while the original is still being searched.
+        """
+        vocab = dict(self.vocab)
+        new_postings = {}  # Term ID -> (doc ids, tfs) of the new documents
+        doc_lengths = array("I", self.doc_lengths)
+        for idx, tokens in enumerate(_tokenize_all(documents), self.N):
+            term_freqs = {}
+            for word in tokens:
+                tid = vocab.get(word)
+                if tid is None:
+                    tid = vocab[sys.intern(word)] = len(vocab)
+                term_freqs[tid] = term_freqs.get(tid, 0) + 1
+            for tid, tf in term_freqs.items():
+                postings = new_postings.get(tid)
+                if postings is None:
+                    postings = new_postings[tid] = (array("I"), array("I"))
+                postings[0].append(idx)
+                postings[1].append(tf)
+            doc_lengths.append(len(tokens))
+        if len(doc_lengths) == self.N:
+            return
+
+        # Copy runs of untouched postings in one slice each and splice the new
+        # postings in after their term's old ones
+        old_offsets, old_doc_ids, old_tfs = self.offsets, self.doc_ids, self.tfs
+        old_terms = len(old_offsets) - 1
+        doc_ids = array("I")
+        tfs = array("I")
+        copied = 0
+        for tid in sorted(new_postings):
+            end = old_offsets[min(tid + 1, old_terms)]
+            doc_ids.extend(old_doc_ids[copied:end])
+            tfs.extend(old_tfs[copied:end])
+            copied = end
+            doc_ids.extend(new_postings[tid][0])
+            tfs.extend(new_postings[tid][1])
+        doc_ids.extend(old_doc_ids[copied:])
+        tfs.extend(old_tfs[copied:])
+
+        offsets = array("I", [0])
+        shift = 0
+        for tid in range(len(vocab)):
+            postings = new_postings.get(tid)
+            if postings is not None:
+                shift += len(postings[0])
+            offsets.append(old_offsets[min(tid + 1, old_terms)] + shift)
+
+        self._set_postings(vocab, offsets, doc_ids, tfs, doc_lengths)
+
+    def _set_postings(self, vocab, offsets, doc_ids, tfs, doc_lengths):
+        """Install flat postings and derive N, avgdl, idf and impact weights"""
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self._invalidate_weights()
+        self.N = len(doc_lengths)
+        self.doc_freqs = array("I", map(sub, offsets[1:], offsets))
         if self.N == 0:
+            self.avgdl = 0
+            self.idf = array("d")
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
+        self.avgdl = sum(doc_lengths) / self.N
+        self.idf = array(
+            "d",
+            (log((self.N - freq + 0.5) / (freq + 0.5) + 1) for freq in self.doc_freqs),
+        )
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+    def _accumulate(self, query):
+        """Return (scores, touched): flat score array and ids of matching docs"""
+        term_ids = self.term_ids(query)
+        scores = [0] * self.N
+        touched = []
+        offsets = self.offsets
 
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+        if self.impact:
+            for tid in term_ids:
+                docs, weights = self.term_impacts(tid)
+                for idx, weight in zip(docs, weights):
+                    if not scores[idx]:
+                        touched.append(idx)
+                    scores[idx] += weight
+            return scores, touched
 
+        # Only documents that appear in a query term's postings list are touched
+        k1 = self.k1
+        for tid in term_ids:
+            idf = self.idf[tid]
+            start, end = offsets[tid], offsets[tid + 1]
+            for idx, tf in zip(self.doc_ids[start:end], self.tfs[start:end]):
+                if not scores[idx]:
+                    touched.append(idx)
+                denominator = tf + k1 * (
+                    1 - self.b + self.b * self.doc_lengths[idx] / self.avgdl
+                )
+                scores[idx] += idf * (tf * (k1 + 1)) / denominator
+
+        return scores, touched
+
+    @profiled("bm25.score")
     def score(self, query):
         """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
-
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
-
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (
-                        1 - self.b + self.b * doc_len / self.avgdl
+        np = self._numpy_backend()
+        if np is not None:
+            scores = self.score_many([query])[0]
+            order = np.argsort(-scores, kind="stable")
+            return list(zip(order.tolist(), scores[order].tolist()))
+
+        scores, _ = self._accumulate(query)
+        return sorted(enumerate(scores), key=lambda x: x[1], reverse=True)
+
+    @profiled("bm25.score_many")
+    def score_many(self, queries):
+        """Score a batch of queries at once; returns a (queries x docs) NumPy array"""
+        np = self._numpy_backend() or _numpy()
+        if np is None:
+            raise ImportError("score_many requires NumPy")
+        if self._csr is None:
+            self._csr = _CsrMatrix(self, np)
+
+        # Sparse (queries x terms) @ (terms x docs) product: gather the postings
+        # of every query's terms and sum contributions per (query, doc) cell
+        all_docs, all_weights = [], []
+        for qi, query in enumerate(queries):
+            docs, weights = self._csr.gather(self.term_ids(query), np)
+            # Widen before offsetting: queries * N can exceed uint32
+            all_docs.append(docs.astype(np.int64) + qi * self.N)
+            all_weights.append(weights)
+        flat = np.bincount(
+            np.concatenate(all_docs) if all_docs else np.zeros(0, dtype=np.int64),
+            weights=np.concatenate(all_weights) if all_weights else None,
+            minlength=len(queries) * self.N,
+        )
+        return flat.reshape(len(queries), self.N)
+
+    @profiled("bm25.top_k")
+    def top_k(self, query, k, min_score=0):
+        """Return the k best (idx, score) pairs with score > min_score"""
+        if k <= 0:
+            return []
+
+        np = self._numpy_backend()
+        if np is not None:
+            return _top_k_array(self.score_many([query])[0], k, min_score, np)
+
+        scores, touched = self._accumulate(query)
+        return _top_k_touched(scores, touched, k, min_score)
+
+
+def _top_k_touched(scores, touched, k, min_score=0, base=0):
+    """
+    Best k (idx - base, score) pairs among the touched ids of a score list.
+
+    Ties keep document order, matching BM25.score().
+    """
+    best = heapq.nlargest(
+        k,
+        (idx for idx in touched if scores[idx] > min_score),
+        key=lambda idx: (scores[idx], -idx),
+    )
+    return [(idx - base, scores[idx]) for idx in best]
+
+
+def _top_k_array(scores, k, min_score, np):
+    """NumPy version of _top_k_touched over a dense score array"""
+    candidates = np.flatnonzero(scores > min_score)
+    if len(candidates) > k:
+        keep = np.argpartition(-scores[candidates], k - 1)[:k]
+        # Widen to every candidate tied with the k-th score so ties
+        # resolve by document order, matching the Python path
+        kth = scores[candidates[keep]].min()
+        candidates = candidates[scores[candidates] >= kth]
+    order = np.lexsort((candidates, -scores[candidates]))[:k]
+    best = candidates[order]
+    return list(zip(best.tolist(), scores[best].tolist()))
+
+
+# ============ INDEX CACHE ============
+class CsvIndex:
+    """
+    Fitted BM25 index plus the output columns of the CSV file it was built from.
+
+    Rows are stored as tuples aligned with `columns` (or a MappedRows view of
+    the CSV); dicts are only built for the rows a search actually returns.
+    append_state records where the indexed data ends (see _append_state) so
+    rows appended to the CSV later can be indexed incrementally.
+    """
+
+    def __init__(self, bm25, columns, rows, signature, append_state=None):
+        self.bm25 = bm25
+        self.columns = columns
+        self.rows = rows
+        self.signature = signature
+        self.append_state = append_state
+
+    def row(self, idx):
+        """Return row idx as a dict of its output columns"""
+        return dict(zip(self.columns, self.rows[idx]))
+
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _file_signature(filepath):
+    """Return (mtime_ns, size) used to detect changes to a data file"""
+    stat = filepath.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _field(row, i):
+    """Field i of a csv.reader row; fields missing from short rows read as None"""
+    return row[i] if i < len(row) else None
+
+
+def _decode_line(line):
+    """Decode a raw CSV line with the newline translation of a text-mode file"""
+    return line.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class MappedRows:
+    """
+    Read-only sequence of CSV rows decoded on demand from a memory map.
+
+    starts/ends hold the byte range of each record, so fetching a row decodes
+    only that record. The map is opened lazily and is not pickled.
+    """
+
+    def __init__(self, filepath, positions, starts=None, ends=None):
+        self.filepath = str(filepath)
+        self.positions = positions
+        self.starts = array("Q") if starts is None else starts
+        self.ends = array("Q") if ends is None else ends
+        self._mmap = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        return state
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, idx):
+        if self._mmap is None:
+            import mmap
+
+            with open(self.filepath, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        record = _decode_line(self._mmap[self.starts[idx] : self.ends[idx]])
+        row = next(csv.reader(io.StringIO(record, newline="")), [])
+        return tuple(_field(row, i) for i in self.positions)
+
+
+def _stream_csv(filepath, search_cols, output_cols, keep_rows=True, resume=None):
+    """
+    Read a CSV file positionally, keeping only what an index needs.
+
+    Returns (columns, rows, mapped, documents, extent): the output columns
+    present in the header, a list of row tuples (None unless keep_rows), a
+    MappedRows offset table, a generator of the search text of each row and
+    a dict with the byte offsets where the header and the data end plus the
+    CRC32 and last byte of the data read (see _append_state). rows, mapped
+    and extent fill as documents is consumed. With resume, the append state
+    of an earlier read, rows are read from where that read ended.
+    Fields missing from short rows read as None and columns missing from the
+    header as "", matching csv.DictReader.
+    """
+    f = open(filepath, "rb")
+    consumed = 0
+    crc = 0  # CRC32 of bytes [0, consumed), computed while reading
+    last = b""
+
+    def lines():
+        nonlocal consumed, crc, last
+        for line in f:
+            consumed += len(line)
+            crc = zlib.crc32(line, crc)
+            last = line[-1:]
+            yield _decode_line(line)
+
+    reader = csv.reader(lines())
+    header = next(reader, None) or []
+    position = {name: i for i, name in enumerate(header)}  # Last duplicate wins
+    columns = tuple(col for col in output_cols if col in position)
+    search_pos = [position.get(col) for col in search_cols]
+    output_pos = [position[col] for col in columns]
+    rows = [] if keep_rows else None
+    mapped = MappedRows(filepath, output_pos)
+    extent = {"header": consumed, "end": consumed, "crc": crc, "last": last}
+    if resume is not None:
+        consumed, crc, terminated = resume
+        last = b"\n" if terminated else b""
+        f.seek(consumed)
+
+    def documents():
+        # Parse time is recorded as csv.parse, excluding the time the consumer
+        # (tokenizing and fitting) spends between documents
+        timed = _profiler.enabled
+        elapsed = 0.0
+        with f:
+            record_start = consumed
+            start = time.perf_counter() if timed else 0.0
+            for row in reader:
+                if row:
+                    mapped.starts.append(record_start)
+                    mapped.ends.append(consumed)
+                    if keep_rows:
+                        rows.append(tuple(_field(row, i) for i in output_pos))
+                    text = " ".join(
+                        "" if i is None else str(_field(row, i)) for i in search_pos
                     )
-                    score += idf * numerator / denominator
+                    if timed:
+                        elapsed += time.perf_counter() - start
+                    yield text
+                    if timed:
+                        start = time.perf_counter()
+                record_start = consumed
+            extent.update(end=consumed, crc=crc, last=last)
+        if timed:
+            _profiler.record("csv.parse", elapsed + time.perf_counter() - start)
 
-            scores.append((idx, score))
+    return columns, rows, mapped, documents(), extent
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
 
+def _crc_prefix(filepath, end):
+    """Return (CRC32 of the first `end` bytes, byte at end)"""
+    crc = 0
+    with open(filepath, "rb") as f:
+        remaining = end
+        while remaining > 0:
+            chunk = f.read(min(APPEND_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            remaining -= len(chunk)
+        after = f.read(1)
+    return crc, after
 
-# ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load CSV and return list of dicts"""
-    with open(filepath, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
 
+def _append_state(extent):
+    """
+    Return (end, prefix_crc, terminated) for the bytes read by _stream_csv;
+    terminated is whether they end with a newline.
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
-    if not filepath.exists():
-        return []
+    A later version of the file counts as an append when it is longer, its
+    first `end` bytes have the same CRC32 and, if the data was not
+    terminated, the appended bytes start with a line break (otherwise they
+    would extend the last record). The CRC is taken while parsing, so a
+    build costs no extra read, and checking the whole prefix catches edits
+    anywhere in the old rows.
+    """
+    return extent["end"], extent["crc"], extent["last"] == b"\n"
 
-    data = _load_csv(filepath)
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+def _is_append(filepath, state, size):
+    """Whether a file of `size` bytes is the data state describes plus new rows"""
+    if state is None:
+        return False
+    end, prefix_crc, terminated = state
+    if size <= end:
+        return False
+    crc, after = _crc_prefix(filepath, end)
+    return (terminated or after in (b"\n", b"\r")) and crc == prefix_crc
 
-    # BM25 search
-    bm25 = BM25()
+
+@profiled("index.build")
+def _build_index(filepath, search_cols, output_cols, signature, storage="memory"):
+    """Stream a CSV file and fit a BM25 index over its search columns"""
+    columns, rows, mapped, documents, extent = _stream_csv(
+        filepath, search_cols, output_cols, keep_rows=storage != "mmap"
+    )
+    bm25 = BM25(impact=True)
     bm25.fit(documents)
-    ranked = bm25.score(query)
+    return CsvIndex(
+        bm25,
+        columns,
+        mapped if rows is None else rows,
+        signature,
+        _append_state(extent),
+    )
+
+
+@profiled("index.extend")
+def _extend_index(index, filepath, search_cols, output_cols, signature):
+    """
+    Index only the rows appended to a CSV since `index` was built.
+
+    Returns a new CsvIndex (the old one is left intact for concurrent
+    searches), or None when the change is not a pure append.
+    """
+    import copy
+
+    try:
+        if not _is_append(filepath, index.append_state, signature[1]):
+            return None
+        keep_rows = not isinstance(index.rows, MappedRows)
+        columns, rows, mapped, documents, extent = _stream_csv(
+            filepath,
+            search_cols,
+            output_cols,
+            keep_rows=keep_rows,
+            resume=index.append_state,
+        )
+        bm25 = copy.copy(index.bm25)
+        bm25.extend(documents)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None
+    if columns != index.columns:
+        return None
+
+    if keep_rows:
+        rows = index.rows + rows
+    else:
+        old = index.rows
+        rows = MappedRows(
+            filepath, old.positions, old.starts + mapped.starts, old.ends + mapped.ends
+        )
+    return CsvIndex(bm25, columns, rows, signature, _append_state(extent))
+
+
+def _cached_index(key, signature):
+    """Return the cached index for key if it is still fresh, else None"""
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None and index.signature == signature:
+            _index_cache.move_to_end(key)
+            return index
+    return None
+
+
+def _refresh_index(key, filepath, search_cols, output_cols, signature):
+    """
+    Return a fresh index without a full build if possible, else None.
+
+    Tries the memory cache, then an append to a stale cached index, then the
+    precompiled file (which may itself be extended by an append).
+    """
+    index = _cached_index(key, signature)
+    if index is not None:
+        return index
+    with _index_cache_lock:
+        stale = _index_cache.get(key)
+    if stale is not None:
+        index = _extend_index(stale, filepath, search_cols, output_cols, signature)
+    if index is None:
+        index = _load_precompiled(filepath, search_cols, output_cols, signature)
+    if index is not None:
+        _cache_index(key, index)
+    return index
+
+
+def _cache_index(key, index):
+    """Insert an index into the LRU cache, evicting the oldest entries"""
+    with _index_cache_lock:
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+
+def get_index(filepath, search_cols, output_cols):
+    """Return a cached index for a CSV file, rebuilding it if the file changed"""
+    key = (str(filepath), tuple(search_cols), tuple(output_cols))
+    signature = _file_signature(filepath)
+
+    index = _refresh_index(key, filepath, search_cols, output_cols, signature)
+    if index is None:
+        index = _build_index(filepath, search_cols, output_cols, signature, ROW_STORAGE)
+        _cache_index(key, index)
+    return index
+
+
+def clear_index_cache():
+    """Drop all cached indexes (next search reloads from disk)"""
+    with _index_cache_lock:
+        _index_cache.clear()
+    with _unified_cache_lock:
+        _unified_cache.clear()
+
+
+def configure_row_storage(mode):
+    """
+    Choose how indexes keep result rows: "memory" (tuples in RAM) or "mmap"
+    (decoded from the memory-mapped CSV only when returned). Clears the cache.
+    """
+    global ROW_STORAGE
+    if mode not in ROW_STORAGE_MODES:
+        raise ValueError(
+            f"Unknown row storage: {mode}. Available: {', '.join(ROW_STORAGE_MODES)}"
+        )
+    ROW_STORAGE = mode
+    clear_index_cache()
+
+
+def indexes_cached(domains=(), stacks=()):
+    """
+    Return True when the index for every existing CSV of the given domains
+    and stacks is already in memory and current, so nothing has to be loaded.
+    """
+    for filepath, search_cols, output_cols in _index_sources(domains, stacks):
+        if not filepath.exists():
+            continue
+        key = (str(filepath), tuple(search_cols), tuple(output_cols))
+        if _cached_index(key, _file_signature(filepath)) is None:
+            return False
+    return True
+
+
+@profiled("index.prefetch")
+def prefetch_indexes(domains=(), stacks=()):
+    """
+    Make sure the indexes for the given domains and stacks are loaded.
+
+    Indexes that are neither cached nor in the precompiled file are built in
+    worker processes when there are several of them and their CSVs total at
+    least PROCESS_POOL_MIN_BYTES; smaller builds run inline. Returns the
+    number of indexes available.
+    """
+    count = 0
+    cold = []
+    for filepath, search_cols, output_cols in _index_sources(domains, stacks):
+        if not filepath.exists():
+            continue
+        count += 1
+        key = (str(filepath), tuple(search_cols), tuple(output_cols))
+        signature = _file_signature(filepath)
+        if _refresh_index(key, filepath, search_cols, output_cols, signature):
+            continue
+        cold.append((filepath, search_cols, output_cols, signature, ROW_STORAGE))
+
+    built = None
+    total_bytes = sum(job[3][1] for job in cold)
+    if len(cold) > 1 and total_bytes >= PROCESS_POOL_MIN_BYTES:
+        # Deferred: concurrent.futures.process is the slowest import in core
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+        # Never fork: this runs from daemon handler threads and next to the
+        # design-system thread pool, where forking a threaded process can
+        # deadlock the children
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(len(cold), os.cpu_count() or 1), mp_context=context
+            ) as pool:
+                built = list(pool.map(_build_index, *zip(*cold)))
+        except (OSError, BrokenProcessPool):
+            built = None  # No usable worker processes here; build inline
+    if built is None:
+        built = [_build_index(*job) for job in cold]
 
+    for (filepath, search_cols, output_cols, _, _), index in zip(cold, built):
+        _cache_index((str(filepath), tuple(search_cols), tuple(output_cols)), index)
+    return count
+
+
+def warm_indexes():
+    """
+    Load indexes for every domain and stack into the cache and compute all
+    their impact weights, so no query pays for them; return the count.
+    """
+    count = prefetch_indexes(CSV_CONFIG, STACK_CONFIG)
+    for filepath, search_cols, output_cols in _index_sources():
+        if filepath.exists():
+            get_index(filepath, search_cols, output_cols).bm25.compute_impacts()
+    return count
+
+
+def _scan_csv_files(directory, prefix):
+    """Yield (relative path, mtime_ns, size) for every CSV below directory"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                yield from _scan_csv_files(entry.path, f"{prefix}{entry.name}/")
+            elif entry.name.endswith(".csv"):
+                stat = entry.stat()
+                yield (prefix + entry.name, stat.st_mtime_ns, stat.st_size)
+
+
+_fingerprint = {"signature": None, "digest": None}
+_fingerprint_lock = threading.Lock()
+
+
+def data_fingerprint():
+    """
+    Return a SHA-256 content hash of every CSV under DATA_DIR.
+
+    File contents are only re-hashed when a file's path, mtime or size
+    changes, so repeated calls cost one stat per file.
+    """
+    signature = tuple(sorted(_scan_csv_files(str(DATA_DIR), "")))
+    with _fingerprint_lock:
+        if _fingerprint["signature"] == signature:
+            return _fingerprint["digest"]
+
+    import hashlib
+
+    digest = hashlib.sha256()
+    for relpath, _, _ in signature:
+        digest.update(relpath.encode("utf-8") + b"\0")
+        digest.update((DATA_DIR / relpath).read_bytes())
+    with _fingerprint_lock:
+        _fingerprint["signature"] = signature
+        _fingerprint["digest"] = digest.hexdigest()
+    return _fingerprint["digest"]
+
+
+# ============ PRECOMPILED INDEX FILE ============
+# Layout: magic | uint64 TOC length | uint32 TOC CRC32 | pickled TOC | two
+# pickled blobs per index. The TOC maps (CSV path relative to DATA_DIR, search
+# columns, output columns) to the CSV signature the blobs were built from, the
+# offset and length of the index blob (BM25, the row offset table and the
+# append state), the length of the row blob that follows it and the CRC32 of
+# each blob, so a search only unpickles (and checks) the index it needs and
+# "mmap" row storage never unpickles the rows at all. Entries for CSVs that
+# were appended to since are extended instead of rebuilt.
+_INDEX_MAGIC = b"UIPXID12"
+_INDEX_HEADER = struct.Struct("<8sQI")
+
+_precompiled = {"signature": None, "toc": {}}
+_precompiled_lock = threading.Lock()
+
+
+def _index_key(filepath, search_cols, output_cols):
+    """Return the precompiled-index key for a CSV file, or None if outside DATA_DIR"""
+    try:
+        relpath = Path(filepath).resolve().relative_to(DATA_DIR.resolve())
+    except ValueError:
+        return None
+    return (relpath.as_posix(), tuple(search_cols), tuple(output_cols))
+
+
+def _index_sources(domains=None, stacks=None):
+    """Yield (filepath, search_cols, output_cols) for the given (default: all) sources"""
+    for domain in CSV_CONFIG if domains is None else domains:
+        config = CSV_CONFIG[domain]
+        yield DATA_DIR / config["file"], config["search_cols"], config["output_cols"]
+    for stack in STACK_CONFIG if stacks is None else stacks:
+        yield (
+            DATA_DIR / STACK_CONFIG[stack]["file"],
+            _STACK_COLS["search_cols"],
+            _STACK_COLS["output_cols"],
+        )
+
+
+def build_index_file(path=None):
+    """Precompile indexes for all domains and stacks into a single file"""
+    import pickle
+    import tempfile
+
+    path = Path(path) if path else INDEX_FILE
+    toc = {}
+    blobs = []
+    offset = 0
+    for filepath, search_cols, output_cols in _index_sources():
+        key = _index_key(filepath, search_cols, output_cols)
+        if key is None or key in toc or not filepath.exists():
+            continue
+        signature = _file_signature(filepath)
+        columns, rows, mapped, documents, extent = _stream_csv(
+            filepath, search_cols, output_cols
+        )
+        bm25 = BM25(impact=True)
+        bm25.fit(documents)
+        bm25.compute_impacts()  # Loaded indexes then score without a warm-up
+        append_state = _append_state(extent)
+        blob = pickle.dumps(
+            (bm25, columns, mapped.positions, mapped.starts, mapped.ends, append_state),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        rows_blob = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+        toc[key] = (
+            signature,
+            offset,
+            len(blob),
+            len(rows_blob),
+            zlib.crc32(blob),
+            zlib.crc32(rows_blob),
+        )
+        blobs += [blob, rows_blob]
+        offset += len(blob) + len(rows_blob)
+
+    toc_blob = pickle.dumps(toc, protocol=pickle.HIGHEST_PROTOCOL)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp file: concurrent builds must not write into or rename
+    # away each other's output
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            header = (_INDEX_MAGIC, len(toc_blob), zlib.crc32(toc_blob))
+            f.write(_INDEX_HEADER.pack(*header))
+            f.write(toc_blob)
+            for blob in blobs:
+                f.write(blob)
+        # mkstemp creates 0600; the index only holds what the data files
+        # already expose, so every user of a shared install may load it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return {"file": str(path), "indexes": len(toc), "bytes": path.stat().st_size}
+
+
+def _precompiled_toc():
+    """Load (or reuse) the TOC of the precompiled index file"""
+    if INDEX_FILE is None:
+        return None, {}
+    try:
+        signature = _file_signature(INDEX_FILE)
+    except OSError:
+        return None, {}
+
+    with _precompiled_lock:
+        if _precompiled["signature"] == signature:
+            return signature, _precompiled["toc"]
+        import pickle
+
+        try:
+            with open(INDEX_FILE, "rb") as f:
+                magic, toc_length, toc_crc = _INDEX_HEADER.unpack(
+                    f.read(_INDEX_HEADER.size)
+                )
+                if magic != _INDEX_MAGIC:
+                    return None, {}
+                toc_blob = f.read(toc_length)
+            if zlib.crc32(toc_blob) != toc_crc:
+                return None, {}
+            base = _INDEX_HEADER.size + toc_length
+            toc = {
+                key: (sig, base + offset, *rest)
+                for key, (sig, offset, *rest) in pickle.loads(toc_blob).items()
+            }
+        except Exception:  # A corrupt cache must never break search
+            return None, {}
+        _precompiled["signature"] = signature
+        _precompiled["toc"] = toc
+        return signature, toc
+
+
+@profiled("index.load_precompiled")
+def _load_precompiled(filepath, search_cols, output_cols, signature):
+    """Return a CsvIndex from the precompiled file if it is fresh for this CSV"""
+    _, toc = _precompiled_toc()
+    if not toc:
+        return None  # No index file: skip resolving paths for the key
+    key = _index_key(filepath, search_cols, output_cols)
+    entry = toc.get(key)
+    if entry is None:
+        return None
+    import pickle
+
+    built_from, offset, length, rows_length, crc, rows_crc = entry
+    if built_from != signature and built_from[1] >= signature[1]:
+        return None  # Changed but not grown: cannot be an append
+    mapped = ROW_STORAGE == "mmap"
+    try:
+        with open(INDEX_FILE, "rb") as f:
+            f.seek(offset)
+            blob = f.read(length if mapped else length + rows_length)
+        if zlib.crc32(blob[:length]) != crc or not (
+            mapped or zlib.crc32(blob[length:]) == rows_crc
+        ):
+            return None
+        bm25, columns, positions, starts, ends, append_state = pickle.loads(
+            blob[:length]
+        )
+        if mapped:
+            rows = MappedRows(filepath, positions, starts, ends)
+        else:
+            rows = pickle.loads(blob[length:])
+        _check_precompiled(bm25, columns, rows, len(starts))
+        index = CsvIndex(bm25, columns, rows, built_from, append_state)
+        if built_from != signature:
+            index = _extend_index(index, filepath, search_cols, output_cols, signature)
+    except Exception:  # Corrupt entry: fall back to building from the CSV
+        return None
+    return index
+
+
+def _check_precompiled(bm25, columns, rows, n_rows):
+    """Raise ValueError unless an unpickled entry has the shape of an index"""
+    if not (
+        isinstance(bm25, BM25)
+        and isinstance(columns, tuple)
+        and bm25.N == n_rows == len(rows)
+        and all(isinstance(col, str) for col in columns)
+    ):
+        raise ValueError("malformed precompiled index entry")
+
+
+# ============ KEYWORD CLASSIFIER ============
+class KeywordClassifier:
+    """
+    Aho-Corasick automaton over ordered groups of keywords.
+
+    One pass over the text finds every keyword that occurs in it as a
+    substring, overlapping matches included, so a group's count equals the
+    number of its keywords for which `keyword in text` is true. Groups keep
+    their declaration order, which breaks ties.
+    """
+
+    def __init__(self, groups):
+        items = groups.items() if hasattr(groups, "items") else groups
+        self.labels = []
+        self._keyword_groups = []  # Keyword id -> indexes of groups containing it
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        self._always = set()  # Ids of empty keywords, which match any text
+        keyword_ids = {}
+        for group, (label, keywords) in enumerate(items):
+            self.labels.append(label)
+            for keyword in dict.fromkeys(keywords):
+                kid = keyword_ids.get(keyword)
+                if kid is None:
+                    kid = keyword_ids[keyword] = len(self._keyword_groups)
+                    self._keyword_groups.append([])
+                    self._insert(keyword, kid)
+                self._keyword_groups[kid].append(group)
+        self._link()
+        # Transitions resolved through failure links, filled in lazily per state
+        self._delta = [dict(edges) for edges in self._goto]
+
+    def _insert(self, keyword, kid):
+        if not keyword:
+            self._always.add(kid)
+            return
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = self._goto[state][ch] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += (kid,)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = fail
+                self._out[nxt] += self._out[fail]
+
+    def _step(self, state, ch):
+        nxt = self._delta[state].get(ch)
+        if nxt is None:
+            fail = state
+            while fail and ch not in self._goto[fail]:
+                fail = self._fail[fail]
+            nxt = self._delta[state][ch] = self._goto[fail].get(ch, 0)
+        return nxt
+
+    def keywords(self, text):
+        """Return the ids of all keywords occurring in text"""
+        found = set(self._always)
+        out = self._out
+        delta = self._delta
+        state = 0
+        for ch in text:
+            nxt = delta[state].get(ch)
+            state = self._step(state, ch) if nxt is None else nxt
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def counts(self, text):
+        """Number of distinct keywords of each group found in text, in group order"""
+        counts = [0] * len(self.labels)
+        for kid in self.keywords(text):
+            for group in self._keyword_groups[kid]:
+                counts[group] += 1
+        return counts
+
+    def best(self, text, default=None):
+        """Label of the group with the most matches (earliest on ties), else default"""
+        counts = self.counts(text)
+        top = max(counts, default=0)
+        return self.labels[counts.index(top)] if top > 0 else default
+
+    def first(self, text, default=None):
+        """Label of the earliest declared group with any match, else default"""
+        counts = self.counts(text)
+        for label, count in zip(self.labels, counts):
+            if count:
+                return label
+        return default
+
+
+# ============ UNIFIED INDEX ============
+class UnifiedIndex:
+    """
+    One postings structure over several domain indexes, scored in one pass.
+
+    Each term's postings are the impact-ordered postings of every domain
+    containing it, concatenated in domain order with doc ids shifted by the
+    domain's base offset. Weights are copied from the domain indexes, so every
+    domain keeps its own idf and length statistics and per-domain rankings are
+    exactly those of BM25.top_k on the domain index.
+    """
+
+    def __init__(self, domains, indexes):
+        self.domains = list(domains)
+        self.indexes = list(indexes)
+        self.bases = []
+        self.N = 0
+        per_term = {}
+        for index in self.indexes:
+            bm25 = index.bm25
+            bm25.compute_impacts()
+            self.bases.append(self.N)
+            for term, tid in bm25.vocab.items():
+                per_term.setdefault(term, []).append((bm25, tid, self.N))
+            self.N += bm25.N
+
+        self.vocab = {}
+        self.offsets = array("I", [0])
+        self.doc_ids = array("I")
+        self.weights = array("d")
+        for term, segments in per_term.items():
+            self.vocab[term] = len(self.vocab)
+            for bm25, tid, base in segments:
+                start, end = bm25.offsets[tid], bm25.offsets[tid + 1]
+                self.doc_ids.extend(idx + base for idx in bm25.impact_docs[start:end])
+                self.weights.extend(bm25.impact_weights[start:end])
+            self.offsets.append(len(self.doc_ids))
+        self._np_arrays = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_np_arrays"] = None
+        return state
+
+    def term_ids(self, query):
+        """Map a query to the IDs of its known terms (unknown terms are dropped)"""
+        vocab = self.vocab
+        return [vocab[t] for t in tokenize_query(query) if t in vocab]
+
+    def _numpy_backend(self):
+        if BM25_BACKEND == "python" or self.N == 0:
+            return None
+        if BM25_BACKEND == "auto" and self.N < NUMPY_MIN_DOCS:
+            return None
+        np = _numpy()
+        if np is not None and self._np_arrays is None:
+            self._np_arrays = (
+                np.frombuffer(self.offsets, dtype=np.uint32).astype(np.int64),
+                np.frombuffer(self.doc_ids, dtype=np.uint32).astype(np.int64),
+                np.frombuffer(self.weights, dtype=np.float64),
+            )
+        return np
+
+    @profiled("unified.top_k")
+    def top_k(self, query, k, min_score=0):
+        """
+        Return {domain: [(idx, score), ...]} with each domain's k best rows.
+
+        k is an int or a {domain: k} mapping; domains mapped to 0 are skipped.
+        """
+        limits = [k.get(d, 0) if isinstance(k, dict) else k for d in self.domains]
+        term_ids = self.term_ids(query)
+        offsets = self.offsets
+        ends = self.bases[1:] + [self.N]
+
+        np = self._numpy_backend()
+        if np is not None:
+            indptr, doc_ids, weights = self._np_arrays
+            spans = [(indptr[tid], indptr[tid + 1]) for tid in term_ids]
+            docs = np.concatenate([doc_ids[s:e] for s, e in spans] or [doc_ids[:0]])
+            scores = np.bincount(
+                docs,
+                weights=np.concatenate([weights[s:e] for s, e in spans] or [[]]),
+                minlength=self.N,
+            )
+            return {
+                domain: (
+                    _top_k_array(scores[base:end], limit, min_score, np)
+                    if limit > 0
+                    else []
+                )
+                for domain, base, end, limit in zip(
+                    self.domains, self.bases, ends, limits
+                )
+            }
+
+        scores = [0] * self.N
+        touched = [[] for _ in self.domains]
+        doc_ids, weights = self.doc_ids, self.weights
+        bases = self.bases
+        for tid in term_ids:
+            start, end = offsets[tid], offsets[tid + 1]
+            for idx, weight in zip(doc_ids[start:end], weights[start:end]):
+                if not scores[idx]:
+                    touched[bisect_right(bases, idx) - 1].append(idx)
+                scores[idx] += weight
+        return {
+            domain: (
+                _top_k_touched(scores, domain_touched, limit, min_score, base)
+                if limit > 0
+                else []
+            )
+            for domain, base, domain_touched, limit in zip(
+                self.domains, bases, touched, limits
+            )
+        }
+
+
+_unified_cache = OrderedDict()
+_unified_cache_lock = threading.Lock()
+
+
+def get_unified_index(domains=None):
+    """
+    Return a UnifiedIndex over the given (default: all) domains whose CSVs
+    exist, rebuilding it when any of their indexes changes.
+    """
+    domains = [
+        domain
+        for domain in (CSV_CONFIG if domains is None else domains)
+        if (DATA_DIR / CSV_CONFIG[domain]["file"]).exists()
+    ]
+    indexes = [
+        get_index(
+            DATA_DIR / CSV_CONFIG[domain]["file"],
+            CSV_CONFIG[domain]["search_cols"],
+            CSV_CONFIG[domain]["output_cols"],
+        )
+        for domain in domains
+    ]
+    key = tuple(domains)
+    with _unified_cache_lock:
+        unified = _unified_cache.get(key)
+        if unified is not None and all(
+            a is b for a, b in zip(unified.indexes, indexes)
+        ):
+            _unified_cache.move_to_end(key)
+            return unified
+
+    unified = UnifiedIndex(domains, indexes)
+    with _unified_cache_lock:
+        _unified_cache[key] = unified
+        _unified_cache.move_to_end(key)
+        while len(_unified_cache) > INDEX_CACHE_SIZE:
+            _unified_cache.popitem(last=False)
+    return unified
+
+
+# ============ RESULT CACHE ============
+class ResultCache:
+    """
+    Thread-safe LRU of search result rows with hit/miss/eviction counters.
+
+    Keys include the data file's signature, so edits to a CSV simply stop
+    matching old entries (which then age out).
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return copies of the cached rows for key, or None"""
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return [dict(row) for row in rows]
+
+    def put(self, key, rows):
+        if self.maxsize <= 0:
+            return
+        rows = tuple(dict(row) for row in rows)
+        with self._lock:
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the entry count"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), maxsize=self.maxsize)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_result_cache = ResultCache()
+
+
+def result_cache_stats():
+    """Return statistics for the search result cache"""
+    return _result_cache.stats()
+
+
+def clear_result_cache():
+    """Drop all cached search results (counters are kept)"""
+    _result_cache.clear()
+
+
+@profiled("search.csv")
+def _cached_search(kind, name, filepath, search_cols, output_cols, query, limit, pool):
+    """BM25 search of one CSV behind the result cache; None if it does not exist"""
+    try:
+        index = _pooled_index(filepath, search_cols, output_cols, pool)
+    except OSError:
+        return None
+    # Key on the index actually searched: a batch's pooled index can be older
+    # than the file on disk, and its rows must not be cached as current
+    key = (kind, name, tokenize_query(query), limit, str(filepath), index.signature)
+    results = _result_cache.get(key)
+    if results is None:
+        # BM25 search: top results with score > 0
+        results = [index.row(idx) for idx, _ in index.bm25.top_k(query, limit)]
+        _result_cache.put(key, results)
     return results
 
 
+# ============ SEARCH FUNCTIONS ============
+def _pooled_index(filepath, search_cols, output_cols, pool=None):
+    """Return the index for a CSV, reusing the batch pool's copy if given"""
+    if pool is None:
+        return get_index(filepath, search_cols, output_cols)
+    # A batch passes a pool so each file's index is resolved once per batch
+    key = (str(filepath), tuple(search_cols), tuple(output_cols))
+    index = pool.get(key)
+    if index is None:
+        index = pool[key] = get_index(filepath, search_cols, output_cols)
+    return index
+
+
+# Substrings that route a query to a domain; the domain with the most distinct
+# matches wins and earlier domains win ties
+DOMAIN_KEYWORDS = {
+    "color": ["color", "palette", "hex", "#", "rgb"],
+    "chart": [
+        "chart",
+        "graph",
+        "visualization",
+        "trend",
+        "bar",
+        "pie",
+        "scatter",
+        "heatmap",
+        "funnel",
+    ],
+    "landing": [
+        "landing",
+        "page",
+        "cta",
+        "conversion",
+        "hero",
+        "testimonial",
+        "pricing",
+        "section",
+    ],
+    "product": [
+        "saas",
+        "ecommerce",
+        "e-commerce",
+        "fintech",
+        "healthcare",
+        "gaming",
+        "portfolio",
+        "crypto",
+        "dashboard",
+    ],
+    "prompt": [
+        "prompt",
+        "css",
+        "implementation",
+        "variable",
+        "checklist",
+        "tailwind",
+    ],
+    "style": [
+        "style",
+        "design",
+        "ui",
+        "minimalism",
+        "glassmorphism",
+        "neumorphism",
+        "brutalism",
+        "dark mode",
+        "flat",
+        "aurora",
+    ],
+    "ux": [
+        "ux",
+        "usability",
+        "accessibility",
+        "wcag",
+        "touch",
+        "scroll",
+        "animation",
+        "keyboard",
+        "navigation",
+        "mobile",
+    ],
+    "typography": ["font", "typography", "heading", "serif", "sans"],
+    "icons": [
+        "icon",
+        "icons",
+        "lucide",
+        "heroicons",
+        "symbol",
+        "glyph",
+        "pictogram",
+        "svg icon",
+    ],
+    "react": [
+        "react",
+        "next.js",
+        "nextjs",
+        "suspense",
+        "memo",
+        "usecallback",
+        "useeffect",
+        "rerender",
+        "bundle",
+        "waterfall",
+        "barrel",
+        "dynamic import",
+        "rsc",
+        "server component",
+    ],
+    "web": [
+        "aria",
+        "focus",
+        "outline",
+        "semantic",
+        "virtualize",
+        "autocomplete",
+        "form",
+        "input type",
+        "preconnect",
+    ],
+}
+
+
+@lru_cache(maxsize=None)
+def _domain_classifier():
+    """Build the domain classifier on first use"""
+    return KeywordClassifier(DOMAIN_KEYWORDS)
+
+
+@lru_cache(maxsize=QUERY_TOKEN_CACHE_SIZE)
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
-
-    domain_keywords = {
-        "color": ["color", "palette", "hex", "#", "rgb"],
-        "chart": [
-            "chart",
-            "graph",
-            "visualization",
-            "trend",
-            "bar",
-            "pie",
-            "scatter",
-            "heatmap",
-            "funnel",
-        ],
-        "landing": [
-            "landing",
-            "page",
-            "cta",
-            "conversion",
-            "hero",
-            "testimonial",
-            "pricing",
-            "section",
-        ],
-        "product": [
-            "saas",
-            "ecommerce",
-            "e-commerce",
-            "fintech",
-            "healthcare",
-            "gaming",
-            "portfolio",
-            "crypto",
-            "dashboard",
-        ],
-        "prompt": [
-            "prompt",
-            "css",
-            "implementation",
-            "variable",
-            "checklist",
-            "tailwind",
-        ],
-        "style": [
-            "style",
-            "design",
-            "ui",
-            "minimalism",
-            "glassmorphism",
-            "neumorphism",
-            "brutalism",
-            "dark mode",
-            "flat",
-            "aurora",
-        ],
-        "ux": [
-            "ux",
-            "usability",
-            "accessibility",
-            "wcag",
-            "touch",
-            "scroll",
-            "animation",
-            "keyboard",
-            "navigation",
-            "mobile",
-        ],
-        "typography": ["font", "typography", "heading", "serif", "sans"],
-        "icons": [
-            "icon",
-            "icons",
-            "lucide",
-            "heroicons",
-            "symbol",
-            "glyph",
-            "pictogram",
-            "svg icon",
-        ],
-        "react": [
-            "react",
-            "next.js",
-            "nextjs",
-            "suspense",
-            "memo",
-            "usecallback",
-            "useeffect",
-            "rerender",
-            "bundle",
-            "waterfall",
-            "barrel",
-            "dynamic import",
-            "rsc",
-            "server component",
-        ],
-        "web": [
-            "aria",
-            "focus",
-            "outline",
-            "semantic",
-            "virtualize",
-            "autocomplete",
-            "form",
-            "input type",
-            "preconnect",
-        ],
-    }
+    return _domain_classifier().best(query.lower(), "style")
 
-    scores = {
-        domain: sum(1 for kw in keywords if kw in query_lower)
-        for domain, keywords in domain_keywords.items()
-    }
-    best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else "style"
 
-
-def search(query, domain=None, max_results=MAX_RESULTS):
+def search(query, domain=None, max_results=MAX_RESULTS, _pool=None):
     """Main search function with auto-domain detection"""
     if domain is None:
         domain = detect_domain(query)
@@ -455,12 +1920,18 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
     filepath = DATA_DIR / config["file"]
 
-    if not filepath.exists():
-        return {"error": f"File not found: {filepath}", "domain": domain}
-
-    results = _search_csv(
-        filepath, config["search_cols"], config["output_cols"], query, max_results
+    results = _cached_search(
+        "domain",
+        domain,
+        filepath,
+        config["search_cols"],
+        config["output_cols"],
+        query,
+        max_results,
+        _pool,
     )
+    if results is None:
+        return {"error": f"File not found: {filepath}", "domain": domain}
 
     return {
         "domain": domain,
@@ -471,7 +1942,7 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     }
 
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
+def search_stack(query, stack, max_results=MAX_RESULTS, _pool=None):
     """Search stack-specific guidelines"""
     if stack not in STACK_CONFIG:
         return {
@@ -480,16 +1951,18 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
 
     filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
 
-    if not filepath.exists():
-        return {"error": f"Stack file not found: {filepath}", "stack": stack}
-
-    results = _search_csv(
+    results = _cached_search(
+        "stack",
+        stack,
         filepath,
         _STACK_COLS["search_cols"],
         _STACK_COLS["output_cols"],
         query,
         max_results,
+        _pool,
     )
+    if results is None:
+        return {"error": f"Stack file not found: {filepath}", "stack": stack}
 
     return {
         "domain": "stack",
@@ -499,3 +1972,99 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
         "count": len(results),
         "results": results,
     }
+
+
+def search_all(query, per_domain_k=MAX_RESULTS, domains=None):
+    """
+    Search several (default: all) domains in one scoring pass.
+
+    per_domain_k is an int or a {domain: max_results} mapping. Each domain's
+    entry in "domains" has the same shape and rows as search(query, domain,
+    k); "best_domain" is the domain with the highest-scoring hit, or None.
+    """
+    domains = list(
+        (per_domain_k if isinstance(per_domain_k, dict) else CSV_CONFIG)
+        if domains is None
+        else domains
+    )
+    unknown = [domain for domain in domains if domain not in CSV_CONFIG]
+    if unknown:
+        return {
+            "error": f"Unknown domain: {', '.join(unknown)}. "
+            f"Available: {', '.join(CSV_CONFIG)}"
+        }
+
+    unified = get_unified_index(domains)
+    hits = unified.top_k(query, per_domain_k)
+    indexes = dict(zip(unified.domains, unified.indexes))
+
+    results = {}
+    best_domain, best_score = None, 0
+    for domain in domains:
+        config = CSV_CONFIG[domain]
+        if domain not in indexes:
+            filepath = DATA_DIR / config["file"]
+            results[domain] = {"error": f"File not found: {filepath}", "domain": domain}
+            continue
+        rows = [indexes[domain].row(idx) for idx, _ in hits[domain]]
+        if hits[domain] and hits[domain][0][1] > best_score:
+            best_domain, best_score = domain, hits[domain][0][1]
+        results[domain] = {
+            "domain": domain,
+            "query": query,
+            "file": config["file"],
+            "count": len(rows),
+            "results": rows,
+        }
+
+    return {
+        "domain": "all",
+        "query": query,
+        "best_domain": best_domain,
+        "domains": results,
+    }
+
+
+def _search_item(item, domain, max_results, pool):
+    """Run one batch item dict, or return {"error": ...} if it is invalid"""
+    query = item.get("query", "")
+    try:
+        limit = int(item.get("max_results", max_results))
+    except (TypeError, ValueError):
+        return {"error": f"Invalid max_results: {item.get('max_results')!r}"}
+    if not isinstance(query, str):
+        return {"error": f"Invalid query: {query!r}"}
+    if item.get("stack"):
+        return search_stack(query, item["stack"], limit, _pool=pool)
+    if item.get("domain", domain) == "all":
+        return search_all(query, limit)
+    return search(query, item.get("domain", domain), limit, _pool=pool)
+
+
+def iter_search_many(queries, domain=None, max_results=MAX_RESULTS):
+    """
+    Run a batch of queries, yielding one result dict per query in order.
+
+    Each item is a query string or a dict with "query" and optional
+    "domain", "stack" and "max_results" keys overriding the batch defaults.
+    Every data file's index is loaded at most once for the whole batch.
+    An invalid item yields {"error": ...} and the batch carries on; an error
+    result echoes the item's "line" key, if any, so streamed input can be
+    matched to its errors.
+    """
+    pool = {}
+    for item in queries:
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict):
+            yield {"error": f"Invalid batch item: {item!r}"}
+            continue
+        result = _search_item(item, domain, max_results, pool)
+        if "error" in result and "line" in item:
+            result = dict(result, line=item["line"])
+        yield result
+
+
+def search_many(queries, domain=None, max_results=MAX_RESULTS):
+    """Batch version of search(); see iter_search_many for item formats"""
+    return list(iter_search_many(queries, domain, max_results))
@@ -13,11 +13,27 @@ Usage:
     result = generate_design_system("SaaS dashboard", "My Project", persist=True, page="dashboard")
 """
 
+import copy
 import csv
+import hashlib
 import json
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from core import search, DATA_DIR
+from threading import Lock
+from core import (
+    search,
+    search_all,
+    indexes_cached,
+    prefetch_indexes,
+    data_fingerprint,
+    tokenize_query,
+    profiled,
+    KeywordClassifier,
+    DATA_DIR,
+)
 
 
 # ============ CONFIGURATION ============
@@ -31,6 +47,32 @@ SEARCH_CONFIG = {
     "typography": {"max_results": 2},
 }
 
+# Generation result cache (memory LRU + optional on-disk tier)
+GENERATION_CACHE_SIZE = 256
+GENERATION_CACHE_TTL = 7 * 24 * 3600  # Seconds; applies to both tiers
+GENERATION_DISK_CACHE_SIZE = 4096  # Max files kept in the disk tier
+CACHE_DIR_ENV = "UIPRO_CACHE_DIR"  # Set to enable the disk tier
+
+
+# Shared pool for rendering page overrides concurrently (created on first use)
+_search_pool = None
+_search_pool_lock = Lock()
+
+
+def _get_search_pool():
+    """Return the shared thread pool used to render page overrides."""
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            # Deferred: concurrent.futures (and the logging it pulls in) is
+            # only needed when several page overrides are rendered
+            from concurrent.futures import ThreadPoolExecutor
+
+            _search_pool = ThreadPoolExecutor(
+                max_workers=len(SEARCH_CONFIG), thread_name_prefix="ds-search"
+            )
+        return _search_pool
+
 
 # ============ DESIGN SYSTEM GENERATOR ============
 class DesignSystemGenerator:
@@ -38,7 +80,9 @@ class DesignSystemGenerator:
 
     def __init__(self):
         self.reasoning_data = self._load_reasoning()
+        self._index_reasoning()
 
+    @profiled("design_system.load_reasoning")
     def _load_reasoning(self) -> list:
         """Load reasoning rules from CSV."""
         filepath = DATA_DIR / REASONING_FILE
@@ -47,50 +91,82 @@ class DesignSystemGenerator:
         with open(filepath, "r", encoding="utf-8") as f:
             return list(csv.DictReader(f))
 
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
-        results = {}
-        for domain, config in SEARCH_CONFIG.items():
-            if domain == "style" and style_priority:
-                # For style, also search with priority keywords
-                priority_query = (
-                    " ".join(style_priority[:2]) if style_priority else query
-                )
-                combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
-            else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
+    def _index_reasoning(self):
+        """Precompute lookup tables and parsed rules for reasoning resolution."""
+        # Exact match: lowercased UI_Category -> first rule index
+        self._rule_exact = {}
+        # Partial match: lowercased categories in rule order
+        self._rule_categories = []
+        # Keyword match: keyword -> first rule index whose category contains it
+        self._rule_keywords = {}
+        # Resolved category -> rule index (or None), filled on demand
+        self._rule_lookup_cache = {}
+
+        for i, rule in enumerate(self.reasoning_data):
+            ui_cat = rule.get("UI_Category", "").lower()
+            self._rule_exact.setdefault(ui_cat, i)
+            self._rule_categories.append(ui_cat)
+            for kw in ui_cat.replace("/", " ").replace("-", " ").split():
+                self._rule_keywords.setdefault(kw, i)
 
-    def _find_reasoning_rule(self, category: str) -> dict:
-        """Find matching reasoning rule for a category."""
+        self._parsed_rules = [self._parse_rule(rule) for rule in self.reasoning_data]
+
+    def _parse_rule(self, rule: dict) -> dict:
+        """Convert a reasoning CSV row into the reasoning dict used by generate()."""
+        # Parse decision rules JSON
+        decision_rules = {}
+        try:
+            decision_rules = json.loads(rule.get("Decision_Rules", "{}"))
+        except json.JSONDecodeError:
+            pass
+
+        return {
+            "pattern": rule.get("Recommended_Pattern", ""),
+            "style_priority": [
+                s.strip() for s in rule.get("Style_Priority", "").split("+")
+            ],
+            "color_mood": rule.get("Color_Mood", ""),
+            "typography_mood": rule.get("Typography_Mood", ""),
+            "key_effects": rule.get("Key_Effects", ""),
+            "anti_patterns": rule.get("Anti_Patterns", ""),
+            "decision_rules": decision_rules,
+            "severity": rule.get("Severity", "MEDIUM"),
+        }
+
+    def _find_reasoning_index(self, category: str):
+        """Return the index of the matching reasoning rule, or None."""
         category_lower = category.lower()
+        if category_lower in self._rule_lookup_cache:
+            return self._rule_lookup_cache[category_lower]
 
         # Try exact match first
-        for rule in self.reasoning_data:
-            if rule.get("UI_Category", "").lower() == category_lower:
-                return rule
+        match = self._rule_exact.get(category_lower)
 
         # Try partial match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            if ui_cat in category_lower or category_lower in ui_cat:
-                return rule
+        if match is None:
+            for i, ui_cat in enumerate(self._rule_categories):
+                if ui_cat in category_lower or category_lower in ui_cat:
+                    match = i
+                    break
 
-        # Try keyword match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            keywords = ui_cat.replace("/", " ").replace("-", " ").split()
-            if any(kw in category_lower for kw in keywords):
-                return rule
+        # Try keyword match (earliest rule with any keyword in the category)
+        if match is None:
+            hits = [i for kw, i in self._rule_keywords.items() if kw in category_lower]
+            match = min(hits) if hits else None
 
-        return {}
+        self._rule_lookup_cache[category_lower] = match
+        return match
+
+    def _find_reasoning_rule(self, category: str) -> dict:
+        """Find matching reasoning rule for a category."""
+        match = self._find_reasoning_index(category)
+        return self.reasoning_data[match] if match is not None else {}
 
     def _apply_reasoning(self, category: str, search_results: dict) -> dict:
         """Apply reasoning rules to search results."""
-        rule = self._find_reasoning_rule(category)
+        match = self._find_reasoning_index(category)
 
-        if not rule:
+        if match is None:
             return {
                 "pattern": "Hero + Features + CTA",
                 "style_priority": ["Minimalism", "Flat Design"],
@@ -102,25 +178,13 @@ class DesignSystemGenerator:
                 "severity": "MEDIUM",
             }
 
-        # Parse decision rules JSON
-        decision_rules = {}
-        try:
-            decision_rules = json.loads(rule.get("Decision_Rules", "{}"))
-        except json.JSONDecodeError:
-            pass
-
-        return {
-            "pattern": rule.get("Recommended_Pattern", ""),
-            "style_priority": [
-                s.strip() for s in rule.get("Style_Priority", "").split("+")
-            ],
-            "color_mood": rule.get("Color_Mood", ""),
-            "typography_mood": rule.get("Typography_Mood", ""),
-            "key_effects": rule.get("Key_Effects", ""),
-            "anti_patterns": rule.get("Anti_Patterns", ""),
-            "decision_rules": decision_rules,
-            "severity": rule.get("Severity", "MEDIUM"),
-        }
+        # Copy the mutable parts so callers cannot alter the parsed rule
+        parsed = self._parsed_rules[match]
+        return dict(
+            parsed,
+            style_priority=list(parsed["style_priority"]),
+            decision_rules=dict(parsed["decision_rules"]),
+        )
 
     def _select_best_match(self, results: list, priority_keywords: list) -> dict:
         """Select best matching result based on priority keywords."""
@@ -164,9 +228,43 @@ class DesignSystemGenerator:
         return search_result.get("results", [])
 
     def generate(self, query: str, project_name: str = None) -> dict:
-        """Generate complete design system recommendation."""
-        # Step 1: First search product to get category
-        product_result = search(query, "product", 1)
+        """Generate complete design system recommendation (cached)."""
+        key = _generation_cache_key(query)
+        design_system = _generation_cache.get(key)
+        if design_system is None:
+            design_system = self._generate(query)
+            _generation_cache.put(key, design_system)
+        # The result depends on the query only through its tokens; the
+        # project name (or raw query) is filled in per call
+        design_system = copy.deepcopy(design_system)
+        design_system["project_name"] = project_name or query.upper()
+        return design_system
+
+    @profiled("design_system.generate")
+    def _generate(self, query: str) -> dict:
+        """Build the design system for a query (without project name)."""
+        # The unified pass only pays off once its index exists; a one-shot
+        # run (indexes not yet in memory) searches each domain on its own
+        warm = indexes_cached(SEARCH_CONFIG)
+
+        # Load any cold indexes up front (in parallel processes for large data)
+        prefetch_indexes(SEARCH_CONFIG)
+
+        # Step 1: Search product to get the category, together with every
+        # domain whose query does not depend on it
+        independent = {
+            domain: config["max_results"]
+            for domain, config in SEARCH_CONFIG.items()
+            if domain != "style"
+        }
+        if warm:
+            search_results = search_all(query, independent)["domains"]
+        else:
+            search_results = {
+                domain: search(query, domain, max_results)
+                for domain, max_results in independent.items()
+            }
+        product_result = search_results["product"]
         product_results = product_result.get("results", [])
         category = "General"
         if product_results:
@@ -176,9 +274,13 @@ class DesignSystemGenerator:
         reasoning = self._apply_reasoning(category, {})
         style_priority = reasoning.get("style_priority", [])
 
-        # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
-        search_results["product"] = product_result  # Reuse product search
+        # Step 3: Style search with style priority hints
+        style_query = query
+        if style_priority:
+            style_query = f"{query} {' '.join(style_priority[:2])}"
+        search_results["style"] = search(
+            style_query, "style", SEARCH_CONFIG["style"]["max_results"]
+        )
 
         # Step 4: Select best matches from each domain using priority
         style_results = self._extract_results(search_results.get("style", {}))
@@ -200,7 +302,6 @@ class DesignSystemGenerator:
         combined_effects = style_effects if style_effects else reasoning_effects
 
         return {
-            "project_name": project_name or query.upper(),
             "category": category,
             "pattern": {
                 "name": best_landing.get(
@@ -246,11 +347,194 @@ class DesignSystemGenerator:
             "severity": reasoning.get("severity", "MEDIUM"),
         }
 
+    async def agenerate(self, query: str, project_name: str = None) -> dict:
+        """Asyncio-compatible generate(); runs without blocking the event loop."""
+        import asyncio
+
+        return await asyncio.to_thread(self.generate, query, project_name)
+
+
+# ============ GENERATION CACHE ============
+class GenerationCache:
+    """
+    Two-tier cache of generated design systems.
+
+    Entries live in an in-memory LRU and, when cache_dir is set, as JSON
+    files on disk so they survive across processes (e.g. CI runs). Both
+    tiers expire entries after ttl seconds and evict the least recently
+    used (memory) or oldest (disk) entries beyond their size limits.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = GENERATION_CACHE_SIZE,
+        ttl: float = GENERATION_CACHE_TTL,
+        cache_dir: str = None,
+        max_disk_entries: int = GENERATION_DISK_CACHE_SIZE,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()  # key -> (created, value)
+        self._lock = Lock()
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str):
+        """Return the cached value for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._store(key, entry)
+        return entry[1]
+
+    def put(self, key: str, value: dict):
+        """Store value under key in memory and, if enabled, on disk."""
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def _store(self, key: str, entry: tuple):
+        # Caller holds self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _read_disk(self, key: str, now: float):
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(stored, dict)
+            or not isinstance(stored.get("created"), (int, float))
+            or not isinstance(stored.get("value"), dict)
+        ):
+            return None  # Not written by _write_disk; treat as a miss
+        if now - stored["created"] > self.ttl:
+            with self._lock:
+                self._stats["expired"] += 1
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return (stored["created"], stored["value"])
+
+    def _write_disk(self, key: str, entry: tuple):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(
+                self._disk_path(key),
+                json.dumps({"created": entry[0], "value": entry[1]}),
+            )
+            self._evict_disk()
+        except OSError:
+            pass  # The disk tier is best-effort
+
+    def _evict_disk(self):
+        files = list(self.cache_dir.glob("*.json"))
+        excess = len(files) - self.max_disk_entries
+        if excess <= 0:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime)
+        for f in files[:excess]:
+            try:
+                f.unlink()
+            except OSError:
+                continue
+            with self._lock:
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and the memory entry count."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def clear(self):
+        """Drop all memory entries (disk files are left to TTL/size eviction)."""
+        with self._lock:
+            self._entries.clear()
+
+
+_generation_cache = GenerationCache(cache_dir=os.environ.get(CACHE_DIR_ENV))
+
+
+_code_version = None
+
+
+def _code_fingerprint() -> str:
+    """Hash of the script sources (name, mtime and size of each *.py file)."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(Path(__file__).resolve().parent.glob("*.py")):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def _generation_cache_key(query: str) -> str:
+    """
+    Cache key: normalized query tokens plus content hashes of DATA_DIR and
+    the script sources, so neither new data nor new code reuses old entries.
+    """
+    payload = json.dumps(
+        [list(tokenize_query(query)), data_fingerprint(), _code_fingerprint()]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def configure_generation_cache(**options) -> GenerationCache:
+    """Replace the generation cache (options as for GenerationCache)."""
+    global _generation_cache
+    _generation_cache = GenerationCache(**options)
+    return _generation_cache
+
+
+def generation_cache_stats() -> dict:
+    """Return statistics for the design-system generation cache."""
+    return _generation_cache.stats()
+
 
 # ============ OUTPUT FORMATTERS ============
 BOX_WIDTH = 90  # Wider box for more content
 
 
+@profiled("format.ascii_box")
 def format_ascii_box(design_system: dict) -> str:
     """Format design system as ASCII box with emojis (MCP-style)."""
     project = design_system.get("project_name", "PROJECT")
@@ -411,6 +695,7 @@ def format_ascii_box(design_system: dict) -> str:
     return "\n".join(lines)
 
 
+@profiled("format.markdown")
 def format_markdown(design_system: dict) -> str:
     """Format design system as markdown."""
     project = design_system.get("project_name", "PROJECT")
@@ -507,6 +792,46 @@ def format_markdown(design_system: dict) -> str:
 
 
 # ============ MAIN ENTRY POINT ============
+_generator = None
+_generator_key = None
+_generator_lock = Lock()
+
+
+def _reasoning_source_key() -> tuple:
+    """Identify the reasoning data a generator was built from (path, mtime, size)."""
+    filepath = DATA_DIR / REASONING_FILE
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return (str(filepath), None, None)
+    return (str(filepath), stat.st_mtime_ns, stat.st_size)
+
+
+def get_generator() -> DesignSystemGenerator:
+    """
+    Return the shared DesignSystemGenerator, creating it on first use.
+
+    The generator (and its parsed reasoning rules) is rebuilt automatically
+    when ui-reasoning.csv or DATA_DIR changes; search indexes are shared
+    through the core index cache.
+    """
+    global _generator, _generator_key
+    key = _reasoning_source_key()
+    with _generator_lock:
+        if _generator is None or _generator_key != key:
+            _generator = DesignSystemGenerator()
+            _generator_key = key
+        return _generator
+
+
+def reload_generator() -> DesignSystemGenerator:
+    """Discard the shared generator and build a fresh one."""
+    global _generator
+    with _generator_lock:
+        _generator = None
+    return get_generator()
+
+
 def generate_design_system(
     query: str,
     project_name: str = None,
@@ -514,6 +839,8 @@ def generate_design_system(
     persist: bool = False,
     page: str = None,
     output_dir: str = None,
+    incremental: bool = False,
+    pages: list = None,
 ) -> str:
     """
     Main entry point for design system generation.
@@ -525,16 +852,20 @@ def generate_design_system(
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        incremental: If True, only rewrite persisted files whose content changed
+        pages: Optional list of pages to persist in the same run (see persist_design_system)
 
     Returns:
         Formatted design system string
     """
-    generator = DesignSystemGenerator()
+    generator = get_generator()
     design_system = generator.generate(query, project_name)
 
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
+        persist_design_system(
+            design_system, page, output_dir, query, incremental, pages
+        )
 
     if output_format == "markdown":
         return format_markdown(design_system)
@@ -542,23 +873,135 @@ def generate_design_system(
 
 
 # ============ PERSISTENCE FUNCTIONS ============
+MANIFEST_FILE = ".manifest.json"
+# Stands in for the generation timestamp while hashing rendered content
+_TIMESTAMP_PLACEHOLDER = "\0GENERATED_AT\0"
+
+
+_manifest_locks = {}
+_manifest_locks_lock = Lock()
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+
+
+def _write_atomic(path: Path, content: str):
+    """Write content to path via a temp file + rename so readers never see partial files."""
+    # A unique temp file per write: concurrent writers of the same path must
+    # not rename each other's temp file away. Created with mode 0666 (not
+    # mkstemp's 0600) so the kernel applies the umask as for a plain open().
+    while True:
+        tmp_path = path.parent / f".{path.name}.{os.urandom(6).hex()}.tmp"
+        try:
+            fd = os.open(tmp_path, _TEMP_FLAGS, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _manifest_lock(design_system_dir: Path) -> Lock:
+    """Return the lock serializing manifest updates of a design-system folder."""
+    key = str(design_system_dir.resolve())
+    with _manifest_locks_lock:
+        return _manifest_locks.setdefault(key, Lock())
+
+
+def _load_manifest(design_system_dir: Path) -> dict:
+    """Load the content-hash manifest of a design-system folder."""
+    try:
+        with open(design_system_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _page_entry(item, page_query: str = None) -> tuple:
+    """
+    Return (name, query) for a page given as a name or as a
+    {"page": ..., "query": ...} dict; raise ValueError for anything else.
+    """
+    if isinstance(item, str):
+        name, query = item, page_query
+    elif isinstance(item, dict):
+        name, query = item.get("page"), item.get("query", page_query)
+    else:
+        raise ValueError(
+            f"Invalid page entry {item!r}: expected a page name "
+            'or an object with a "page" name'
+        )
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError(f'Invalid page entry {item!r}: missing "page" name')
+    if query is not None and not isinstance(query, str):
+        raise ValueError(f'Invalid page entry {item!r}: "query" must be a string')
+    return name, query
+
+
+def load_pages_file(path: str) -> list:
+    """
+    Load a page manifest for bulk persistence.
+
+    Accepts a JSON list (of page names or {"page": ..., "query": ...}
+    objects) or a plain text file with one page name per line. Raises
+    ValueError for a malformed manifest and OSError if it cannot be read.
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        try:
+            pages = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+        if not isinstance(pages, list):
+            raise ValueError(f"{path}: expected a JSON list of pages")
+        for number, item in enumerate(pages, 1):
+            try:
+                _page_entry(item)
+            except ValueError as e:
+                raise ValueError(f"{path}: entry {number}: {e}") from None
+        return pages
+    return [
+        line.strip()
+        for line in text.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+
+
+@profiled("design_system.persist")
 def persist_design_system(
     design_system: dict,
     page: str = None,
     output_dir: str = None,
     page_query: str = None,
+    incremental: bool = False,
+    pages: list = None,
 ) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
 
+    Each file's content (rendered without its timestamp) is hashed and
+    recorded in design-system/<project>/.manifest.json. In incremental mode
+    a file is only rewritten when that hash changed or the file is missing.
+
     Args:
         design_system: The generated design system dictionary
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        incremental: If True, skip files whose content is unchanged
+        pages: Optional list of additional pages, each a page name or a
+            {"page": ..., "query": ...} dict; MASTER.md is still written once
+            and the page overrides are generated concurrently
 
     Returns:
-        dict with created file paths and status
+        dict with created (written) and unchanged file paths and status
     """
     base_dir = Path(output_dir) if output_dir else Path.cwd()
 
@@ -570,35 +1013,67 @@ def persist_design_system(
     pages_dir = design_system_dir / "pages"
 
     created_files = []
+    unchanged_files = []
 
     # Create directories
     design_system_dir.mkdir(parents=True, exist_ok=True)
     pages_dir.mkdir(parents=True, exist_ok=True)
 
-    master_file = design_system_dir / "MASTER.md"
-
-    # Generate and write MASTER.md
-    master_content = format_master_md(design_system)
-    with open(master_file, "w", encoding="utf-8") as f:
-        f.write(master_content)
-    created_files.append(str(master_file))
+    # Render with a placeholder timestamp so unchanged content hashes equal
+    rendered = {"MASTER.md": format_master_md(design_system, _TIMESTAMP_PLACEHOLDER)}
+
+    # Create page override files with intelligent content, one per unique page
+    page_specs = {}
+    for item in ([page] if page else []) + list(pages or []):
+        name, query = _page_entry(item, page_query)
+        page_path = f"pages/{name.lower().replace(' ', '-')}.md"
+        page_specs.setdefault(page_path, (name, query))
+
+    if len(page_specs) > 1:
+        bodies = _get_search_pool().map(
+            lambda spec: format_page_override_md(
+                design_system, spec[0], spec[1], _TIMESTAMP_PLACEHOLDER
+            ),
+            page_specs.values(),
+        )
+    else:
+        bodies = [
+            format_page_override_md(design_system, name, query, _TIMESTAMP_PLACEHOLDER)
+            for name, query in page_specs.values()
+        ]
+    rendered.update(zip(page_specs, bodies))
 
-    # If page is specified, create page override file with intelligent content
-    if page:
-        page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, "w", encoding="utf-8") as f:
-            f.write(page_content)
-        created_files.append(str(page_file))
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Daemon threads may persist the same project at once; the manifest is
+    # read-modify-write, so updates to one folder are serialized
+    with _manifest_lock(design_system_dir):
+        manifest = _load_manifest(design_system_dir)
+        for relpath, body in rendered.items():
+            path = design_system_dir / relpath
+            digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+            if incremental and manifest.get(relpath) == digest and path.exists():
+                unchanged_files.append(str(path))
+                continue
+            _write_atomic(path, body.replace(_TIMESTAMP_PLACEHOLDER, timestamp))
+            manifest[relpath] = digest
+            created_files.append(str(path))
+
+        if created_files:
+            _write_atomic(
+                design_system_dir / MANIFEST_FILE,
+                json.dumps(manifest, indent=2, sort_keys=True) + "\n",
+            )
 
     return {
         "status": "success",
         "design_system_dir": str(design_system_dir),
         "created_files": created_files,
+        "unchanged_files": unchanged_files,
     }
 
 
-def format_master_md(design_system: dict) -> str:
+@profiled("format.master_md")
+def format_master_md(design_system: dict, timestamp: str = None) -> str:
     """Format design system as MASTER.md with hierarchical override logic."""
     project = design_system.get("project_name", "PROJECT")
     pattern = design_system.get("pattern", {})
@@ -608,7 +1083,7 @@ def format_master_md(design_system: dict) -> str:
     effects = design_system.get("key_effects", "")
     anti_patterns = design_system.get("anti_patterns", "")
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     lines = []
 
@@ -883,12 +1358,13 @@ def format_master_md(design_system: dict) -> str:
     return "\n".join(lines)
 
 
+@profiled("format.page_override_md")
 def format_page_override_md(
-    design_system: dict, page_name: str, page_query: str = None
+    design_system: dict, page_name: str, page_query: str = None, timestamp: str = None
 ) -> str:
     """Format a page-specific override file with intelligent AI-generated content."""
     project = design_system.get("project_name", "PROJECT")
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
 
     # Detect page type and generate intelligent overrides
@@ -1000,6 +1476,7 @@ def format_page_override_md(
     return "\n".join(lines)
 
 
+@profiled("design_system.intelligent_overrides")
 def _generate_intelligent_overrides(
     page_name: str, page_query: str, design_system: dict
 ) -> dict:
@@ -1046,13 +1523,12 @@ def _generate_intelligent_overrides(
         effects = style.get("Effects & Animation", "")
 
         # Infer layout from style keywords
-        if any(kw in keywords.lower() for kw in ["data", "dense", "dashboard", "grid"]):
+        density = _LAYOUT_CLASSIFIER.first(keywords.lower())
+        if density == "dense":
             layout["Max Width"] = "1400px or full-width"
             layout["Grid"] = "12-column grid for data flexibility"
             spacing["Content Density"] = "High — optimize for information display"
-        elif any(
-            kw in keywords.lower() for kw in ["minimal", "simple", "clean", "single"]
-        ):
+        elif density == "minimal":
             layout["Max Width"] = "800px (narrow, focused)"
             layout["Layout"] = "Single column, centered"
             spacing["Content Density"] = "Low — focus on clarity"
@@ -1110,64 +1586,72 @@ def _generate_intelligent_overrides(
     }
 
 
+# Page types in priority order with the context substrings that select them
+PAGE_TYPE_KEYWORDS = {
+    "Dashboard / Data View": [
+        "dashboard",
+        "admin",
+        "analytics",
+        "data",
+        "metrics",
+        "stats",
+        "monitor",
+        "overview",
+    ],
+    "Checkout / Payment": [
+        "checkout",
+        "payment",
+        "cart",
+        "purchase",
+        "order",
+        "billing",
+    ],
+    "Settings / Profile": ["settings", "profile", "account", "preferences", "config"],
+    "Landing / Marketing": [
+        "landing",
+        "marketing",
+        "homepage",
+        "hero",
+        "home",
+        "promo",
+    ],
+    "Authentication": ["login", "signin", "signup", "register", "auth", "password"],
+    "Pricing / Plans": ["pricing", "plans", "subscription", "tiers", "packages"],
+    "Blog / Article": ["blog", "article", "post", "news", "content", "story"],
+    "Product Detail": ["product", "item", "detail", "pdp", "shop", "store"],
+    "Search Results": ["search", "results", "browse", "filter", "catalog", "list"],
+    "Empty State": ["empty", "404", "error", "not found", "zero"],
+}
+_PAGE_TYPE_CLASSIFIER = KeywordClassifier(PAGE_TYPE_KEYWORDS)
+# Fallback when the context names no page type: what the matched style is best for
+_BEST_FOR_PAGE_TYPE_CLASSIFIER = KeywordClassifier(
+    {
+        "Dashboard / Data View": ["dashboard", "data"],
+        "Landing / Marketing": ["landing", "marketing"],
+    }
+)
+# Style keywords that make a page dense (data-heavy) or minimal (focused)
+_LAYOUT_CLASSIFIER = KeywordClassifier(
+    {
+        "dense": ["data", "dense", "dashboard", "grid"],
+        "minimal": ["minimal", "simple", "clean", "single"],
+    }
+)
+
+
 def _detect_page_type(context: str, style_results: list) -> str:
     """Detect page type from context and search results."""
-    context_lower = context.lower()
-
     # Check for common page type patterns
-    page_patterns = [
-        (
-            [
-                "dashboard",
-                "admin",
-                "analytics",
-                "data",
-                "metrics",
-                "stats",
-                "monitor",
-                "overview",
-            ],
-            "Dashboard / Data View",
-        ),
-        (
-            ["checkout", "payment", "cart", "purchase", "order", "billing"],
-            "Checkout / Payment",
-        ),
-        (
-            ["settings", "profile", "account", "preferences", "config"],
-            "Settings / Profile",
-        ),
-        (
-            ["landing", "marketing", "homepage", "hero", "home", "promo"],
-            "Landing / Marketing",
-        ),
-        (
-            ["login", "signin", "signup", "register", "auth", "password"],
-            "Authentication",
-        ),
-        (["pricing", "plans", "subscription", "tiers", "packages"], "Pricing / Plans"),
-        (["blog", "article", "post", "news", "content", "story"], "Blog / Article"),
-        (["product", "item", "detail", "pdp", "shop", "store"], "Product Detail"),
-        (
-            ["search", "results", "browse", "filter", "catalog", "list"],
-            "Search Results",
-        ),
-        (["empty", "404", "error", "not found", "zero"], "Empty State"),
-    ]
-
-    for keywords, page_type in page_patterns:
-        if any(kw in context_lower for kw in keywords):
-            return page_type
+    page_type = _PAGE_TYPE_CLASSIFIER.first(context.lower())
+    if page_type:
+        return page_type
 
     # Fallback: try to infer from style results
     if style_results:
-        style_name = style_results[0].get("Style Category", "").lower()
         best_for = style_results[0].get("Best For", "").lower()
-
-        if "dashboard" in best_for or "data" in best_for:
-            return "Dashboard / Data View"
-        elif "landing" in best_for or "marketing" in best_for:
-            return "Landing / Marketing"
+        page_type = _BEST_FOR_PAGE_TYPE_CLASSIFIER.first(best_for)
+        if page_type:
+            return page_type
 
     return "General"
 
@@ -5,18 +5,70 @@ UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py --batch [--domain <domain>] < queries.txt
+       python search.py --build-index
 
 Domains: style, prompt, color, chart, landing, product, ux, typography
+         all (top hits of every domain from one scoring pass)
 Stacks: html-tailwind, react, nextjs
 
 Persistence (Master + Overrides pattern):
   --persist    Save design system to design-system/MASTER.md
   --page       Also create a page-specific override file in design-system/pages/
+  --pages      Comma-separated pages to persist in one run (MASTER.md written once)
+  --pages-file Page manifest: JSON list of names/{"page", "query"} or one name per line
+  --incremental  Only rewrite files whose content changed (tracked in .manifest.json)
+
+Batch mode:
+  --batch      Read newline-delimited queries (or JSONL objects with "query" and
+               optional "domain"/"stack"/"max_results") from stdin and stream
+               one JSON result per line; a bad line yields {"error", "line"}
+
+Search daemon:
+  --serve      Keep all indexes warm and answer requests on a Unix socket
+  --no-daemon  Always run in-process (by default a running daemon is used)
+  --mmap       Keep result rows in the memory-mapped CSVs instead of RAM
+               (also UIPRO_ROW_STORAGE=mmap); useful for daemons serving
+               many large stack files
+
+Profiling:
+  --profile [table|json]  Record per-stage timings (CSV loading, BM25 fit and
+               scoring, multi-domain search, overrides, formatters) and print
+               them to stderr on exit; also enabled by UIPRO_PROFILE=1|json.
+               Runs in-process so the timings are this process's own
+
+Result cache:
+  Search results are cached in memory per (domain or stack, query tokens,
+  max results, data file version).
+  --cache-stats  Print hit/miss/eviction counters (of the daemon, if one is
+                 running); alone, or after a query's output on stderr
+
+Design-system cache:
+  Generated design systems are cached in memory per normalized query and
+  data version; set UIPRO_CACHE_DIR to also keep them on disk across runs.
+
+Precompiled index:
+  --build-index  Serialize all domain/stack indexes to .cache/search-index.bin;
+                 searches load it lazily while it is fresher than the CSVs
 """
 
 import argparse
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
-from design_system import generate_design_system
+import atexit
+import json
+import os
+import sys
+from core import (
+    CSV_CONFIG,
+    AVAILABLE_STACKS,
+    MAX_RESULTS,
+    PROFILE_ENV,
+    build_index_file,
+    configure_row_storage,
+    enable_profiling,
+    format_profile,
+    iter_search_many,
+)
+from server import run, serve
 
 
 def format_output(result):
@@ -49,9 +101,12 @@ def format_output(result):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
-    parser.add_argument("query", help="Search query")
+    parser.add_argument("query", nargs="?", help="Search query")
     parser.add_argument(
-        "--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain"
+        "--domain",
+        "-d",
+        choices=list(CSV_CONFIG.keys()) + ["all"],
+        help="Search domain ('all' returns the top hits of every domain)",
     )
     parser.add_argument(
         "--stack",
@@ -100,6 +155,23 @@ if __name__ == "__main__":
         default=None,
         help="Create page-specific override file in design-system/pages/",
     )
+    parser.add_argument(
+        "--pages",
+        type=str,
+        default=None,
+        help="Comma-separated list of pages to create override files for",
+    )
+    parser.add_argument(
+        "--pages-file",
+        type=str,
+        default=None,
+        help="Manifest of pages (JSON list or one page per line) to persist",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --persist, skip rewriting files whose content is unchanged",
+    )
     parser.add_argument(
         "--output-dir",
         "-o",
@@ -108,17 +180,148 @@ if __name__ == "__main__":
         help="Output directory for persisted files (default: current directory)",
     )
 
+    # Precompiled index
+    parser.add_argument(
+        "--build-index",
+        action="store_true",
+        help="Precompile search indexes for all domains and stacks, then exit",
+    )
+
+    # Batch mode
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read queries from stdin (plain lines or JSONL) and stream JSONL results",
+    )
+    # Search daemon
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a search daemon that keeps indexes warm on a Unix socket",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Daemon socket path (default: $UIPRO_SEARCH_SOCKET or a per-user temp dir)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Do not use a running daemon; search in-process",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Decode result rows from memory-mapped CSVs instead of keeping them in RAM",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Print result/generation cache statistics (daemon's if running)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="table",
+        choices=["table", "json"],
+        default=None,
+        help="Print per-stage timings to stderr on exit (implies --no-daemon)",
+    )
+
     args = parser.parse_args()
+    use_daemon = not args.no_daemon
+    if args.mmap:
+        configure_row_storage("mmap")
+
+    profile_format = args.profile
+    if profile_format is None and os.environ.get(PROFILE_ENV):
+        profile_format = "json" if os.environ[PROFILE_ENV] == "json" else "table"
+    if profile_format:
+        enable_profiling()
+        use_daemon = False  # Stages must run in this process to be timed
+        atexit.register(
+            lambda: print(format_profile(profile_format), file=sys.stderr, flush=True)
+        )
+
+    if args.serve:
+        try:
+            serve(args.socket)
+        except RuntimeError as e:
+            parser.exit(1, f"Error: {e}\n")
+        raise SystemExit(0)
+    if args.build_index:
+        info = build_index_file()
+        print(
+            f"Built {info['indexes']} indexes -> {info['file']} ({info['bytes']} bytes)"
+        )
+        raise SystemExit(0)
+    if args.batch:
+        # Results stream one per item, so a bad line can be reported in
+        # place before the next item is handed on
+        def read_items():
+            for number, line in enumerate(sys.stdin, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line) if line.startswith("{") else line
+                except ValueError as e:
+                    error = {"error": f"Invalid JSON: {e}", "line": number}
+                    print(json.dumps(error, ensure_ascii=False), flush=True)
+                    continue
+                if isinstance(item, str):
+                    item = {"query": item}
+                if isinstance(item, dict):
+                    if args.stack:
+                        item.setdefault("stack", args.stack)
+                    item["line"] = number  # Echoed back on error results
+                yield item
+
+        for result in iter_search_many(read_items(), args.domain, args.max_results):
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+        raise SystemExit(0)
+    if args.cache_stats:
+        if args.query is None:
+            stats = run("cache_stats", args.socket, use_daemon)
+            print(json.dumps(stats, indent=2))
+            raise SystemExit(0)
+        atexit.register(
+            lambda: print(
+                json.dumps(run("cache_stats", args.socket, use_daemon), indent=2),
+                file=sys.stderr,
+            )
+        )
+    if args.query is None:
+        parser.error("the following arguments are required: query")
 
     # Design system takes priority
     if args.design_system:
-        result = generate_design_system(
-            args.query,
-            args.project_name,
-            args.format,
+        pages = []
+        if args.pages:
+            pages += [p.strip() for p in args.pages.split(",") if p.strip()]
+        if args.pages_file:
+            from design_system import load_pages_file
+
+            try:
+                pages += load_pages_file(args.pages_file)
+            except OSError as e:
+                parser.error(f"cannot read --pages-file: {e}")
+            except ValueError as e:
+                parser.error(f"invalid --pages-file: {e}")
+
+        result = run(
+            "generate_design_system",
+            args.socket,
+            use_daemon,
+            query=args.query,
+            project_name=args.project_name,
+            output_format=args.format,
             persist=args.persist,
             page=args.page,
             output_dir=args.output_dir,
+            incremental=args.incremental,
+            pages=pages,
         )
         print(result)
 
@@ -134,8 +337,11 @@ if __name__ == "__main__":
             print(
                 f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)"
             )
-            if args.page:
-                page_filename = args.page.lower().replace(" ", "-")
+            page_names = [p["page"] if isinstance(p, dict) else p for p in pages]
+            page_names = ([args.page] if args.page else []) + page_names
+            for page_filename in dict.fromkeys(
+                name.lower().replace(" ", "-") for name in page_names
+            ):
                 print(
                     f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)"
                 )
@@ -149,19 +355,45 @@ if __name__ == "__main__":
             print("=" * 60)
     # Stack search
     elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
+        result = run(
+            "search_stack",
+            args.socket,
+            use_daemon,
+            query=args.query,
+            stack=args.stack,
+            max_results=args.max_results,
+        )
         if args.json:
-            import json
-
             print(json.dumps(result, indent=2, ensure_ascii=False))
         else:
             print(format_output(result))
+    # All-domain search
+    elif args.domain == "all":
+        result = run(
+            "search_all",
+            args.socket,
+            use_daemon,
+            query=args.query,
+            per_domain_k=args.max_results,
+        )
+        if args.json:
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        elif "error" in result:
+            print(format_output(result))
+        else:
+            print(f"**Best domain:** {result['best_domain'] or 'none'}\n")
+            print("\n".join(format_output(r) for r in result["domains"].values()))
     # Domain search
     else:
-        result = search(args.query, args.domain, args.max_results)
+        result = run(
+            "search",
+            args.socket,
+            use_daemon,
+            query=args.query,
+            domain=args.domain,
+            max_results=args.max_results,
+        )
         if args.json:
-            import json
-
             print(json.dumps(result, indent=2, ensure_ascii=False))
         else:
             print(format_output(result))
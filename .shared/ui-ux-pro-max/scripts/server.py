@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Search Server - keeps all search indexes warm behind a
+Unix domain socket so repeated CLI calls skip CSV parsing and BM25 fitting.
+
+Protocol (JSON lines, one request/response per line, connections may be reused):
+    -> {"op": "search", "query": "saas dashboard", "domain": "style", "max_results": 3}
+    -> {"op": "search_stack", "query": "forms", "stack": "react"}
+    -> {"op": "search_all", "query": "fintech dashboard", "per_domain_k": 2}
+    -> {"op": "generate_design_system", "query": "fintech", "project_name": "Acme"}
+    -> {"op": "cache_stats"}
+    -> {"op": "ping"}
+    <- {"ok": true, "result": ...} | {"ok": false, "error": "..."}
+
+Usage:
+    python search.py --serve [--socket /path/to.sock]
+
+    from server import run
+    result = run("search", query="saas dashboard")  # daemon if running, else in-process
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import core
+
+# socket, socketserver, signal and tempfile are imported where they are used:
+# a plain CLI search with no daemon running should not pay for them.
+
+SOCKET_ENV = "UIPRO_SEARCH_SOCKET"
+CONNECT_TIMEOUT = 0.5  # Seconds to wait for a daemon before falling back
+REQUEST_TIMEOUT = 30
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no search daemon is listening on the socket."""
+
+
+def _instance_id() -> str:
+    """Hash of the data directory and script sources this copy serves."""
+    import hashlib
+
+    digest = hashlib.sha256(str(core.DATA_DIR.resolve()).encode("utf-8"))
+    for path in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _socket_dir() -> Path:
+    """Per-user directory (mode 0700) holding the daemon sockets."""
+    import tempfile
+
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    path = Path(tempfile.gettempdir()) / f"ui-ux-pro-max-{uid}"
+    path.mkdir(mode=0o700, exist_ok=True)
+    return path
+
+
+def default_socket_path() -> str:
+    """
+    Socket path from $UIPRO_SEARCH_SOCKET, else one per data directory and
+    code version in _socket_dir(), so each copy of the skill only ever talks
+    to a daemon serving its own data with its own code.
+    """
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    return str(_socket_dir() / f"{_instance_id()}.sock")
+
+
+def _trusted(path: str) -> bool:
+    """
+    Whether path belongs to this user and sits in a directory other users
+    cannot tamper with (owned by us and not group/other-writable, or sticky).
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    try:
+        stat = os.stat(path)
+        parent = os.stat(os.path.dirname(os.path.abspath(path)))
+    except OSError:
+        return False
+    uid = os.getuid()
+    parent_safe = (parent.st_uid == uid and not parent.st_mode & 0o022) or (
+        parent.st_mode & 0o1000
+    )
+    return stat.st_uid == uid and bool(parent_safe)
+
+
+# ============ OPERATIONS ============
+def _generate_design_system(**params):
+    # design_system imports are deferred so plain searches stay light
+    from design_system import generate_design_system
+
+    return generate_design_system(**params)
+
+
+def _cache_stats():
+    stats = {"search": core.result_cache_stats()}
+    # Only report the generation cache if design systems were generated here
+    design_system = sys.modules.get("design_system")
+    if design_system is not None:
+        stats["design_system"] = design_system.generation_cache_stats()
+    return stats
+
+
+OPERATIONS = {
+    "search": core.search,
+    "search_stack": core.search_stack,
+    "search_all": core.search_all,
+    "generate_design_system": _generate_design_system,
+    "cache_stats": _cache_stats,
+    "ping": lambda: "pong",
+}
+
+
+def execute(op: str, params: dict):
+    """Run an operation in this process."""
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown op: {op}. Available: {', '.join(OPERATIONS)}")
+    return OPERATIONS[op](**params)
+
+
+# ============ SERVER ============
+def _handle_requests(handler):
+    """Answer newline-delimited JSON requests until the client disconnects."""
+    for line in handler.rfile:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            op = request.pop("op")
+            response = {"ok": True, "result": execute(op, request)}
+        except Exception as e:  # Report errors to the client, keep serving
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        handler.wfile.write(
+            json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+        )
+        handler.wfile.flush()
+
+
+def serve(socket_path: str = None, verbose: bool = True):
+    """Warm all indexes and answer requests on a Unix socket until interrupted."""
+    import signal
+    import socketserver
+
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        raise RuntimeError("Unix domain sockets are not supported on this platform")
+
+    socket_path = socket_path or default_socket_path()
+    socket_dir_path = os.path.dirname(os.path.abspath(socket_path))
+    if not _trusted(socket_dir_path) or (
+        os.path.exists(socket_path) and not _trusted(socket_path)
+    ):
+        raise RuntimeError(
+            f"Refusing to serve on {socket_path}: not private to this user"
+        )
+    if os.path.exists(socket_path):
+        try:
+            _call(socket_path, {"op": "ping"})
+        except DaemonUnavailable:
+            os.unlink(socket_path)  # Stale socket from a dead daemon
+        else:
+            raise RuntimeError(f"A search daemon is already running on {socket_path}")
+
+    start = time.perf_counter()
+    count = core.warm_indexes()
+    if verbose:
+        print(
+            f"Warmed {count} indexes in {(time.perf_counter() - start) * 1000:.1f}ms; "
+            f"listening on {socket_path}",
+            flush=True,
+        )
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+
+    class _RequestHandler(socketserver.StreamRequestHandler):
+        handle = _handle_requests
+
+    server = socketserver.ThreadingUnixStreamServer(socket_path, _RequestHandler)
+    server.daemon_threads = True
+    os.chmod(socket_path, 0o600)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+# ============ CLIENT ============
+def _call(socket_path: str, request: dict):
+    """Send one request to the daemon and return the decoded response."""
+    # Never send requests to a socket another user could have planted
+    if not os.path.exists(socket_path) or not _trusted(socket_path):
+        raise DaemonUnavailable(socket_path)
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailable(socket_path)
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path)
+    except OSError as e:
+        raise DaemonUnavailable(socket_path) from e
+
+    # A daemon that stalls or drops the connection mid-request is as good as
+    # absent: the caller falls back to running the operation in-process
+    payload = json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+    try:
+        with sock:
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.sendall(payload)
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        if not line:
+            raise DaemonUnavailable(socket_path)
+        return json.loads(line)
+    except (OSError, ValueError) as e:
+        raise DaemonUnavailable(socket_path) from e
+
+
+def run(op: str, socket_path: str = None, use_daemon: bool = True, **params):
+    """
+    Run an operation on the daemon if one is listening, else in-process.
+
+    Errors raised by the operation on the daemon are re-raised as RuntimeError.
+    """
+    if op == "generate_design_system" and params.get("persist"):
+        # The daemon has its own working directory; persist relative to ours
+        params["output_dir"] = os.path.abspath(params.get("output_dir") or os.getcwd())
+
+    if use_daemon:
+        try:
+            response = _call(socket_path or default_socket_path(), {"op": op, **params})
+        except DaemonUnavailable:
+            pass
+        else:
+            if not response.get("ok"):
+                raise RuntimeError(response.get("error", "daemon error"))
+            return response["result"]
+
+    return execute(op, params)